@@ -0,0 +1,104 @@
+import os
+import json
+import shutil
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+from manifest import hash_file, read_json, write_json, remove_empty_dirs
+from filefunctions import list_static_files
+
+ASSET_MANIFEST_NAME = "asset-manifest.json"
+DEFAULT_HASH_CACHE = os.path.join(".cache", "asset-hashes.json")
+FINGERPRINT_LENGTH = 10
+
+
+def fingerprint_name(item, digest):
+    root, extension = os.path.splitext(item)
+    return f"{root}.{digest[:FINGERPRINT_LENGTH]}{extension}"
+
+
+def url_path(item):
+    return item.replace(os.sep, "/")
+
+
+def hash_assets(paths, cache=None, workers=None):
+    # cache maps path -> [size, mtime_ns, digest]; a file whose size and
+    # mtime still match its entry is not read again
+    cache = cache or {}
+    hashes = {}
+    new_cache = {}
+    stale = []
+    for path in paths:
+        stat = os.stat(path)
+        key = [stat.st_size, stat.st_mtime_ns]
+        entry = cache.get(path)
+        if entry is not None and entry[:2] == key:
+            hashes[path] = entry[2]
+            new_cache[path] = entry
+        else:
+            stale.append((path, key))
+
+    if stale:
+        # hashlib drops the GIL while it hashes, so threads are enough
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            digests = pool.map(hash_file, [path for path, _ in stale])
+            for (path, key), digest in zip(stale, digests):
+                hashes[path] = digest
+                new_cache[path] = key + [digest]
+    return hashes, new_cache, len(stale)
+
+
+def asset_map_digest(asset_map):
+    if not asset_map:
+        return None
+    encoded = json.dumps(asset_map, sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+
+def fingerprint_static(source="static", destination="docs", workers=None,
+                       hash_cache=DEFAULT_HASH_CACHE):
+    # Copies every asset next to its plain copy under a name that carries
+    # its hash, and returns {"index.css": "index.<hash>.css", ...} for the
+    # template to rewrite references with. The plain names stay so url()s
+    # in stylesheets and outside links keep working. The plain copies in
+    # destination are what gets hashed, so a minified stylesheet is
+    # fingerprinted as it is served.
+    items = list_static_files(source)
+    cache = {}
+    if hash_cache:
+        cache = read_json(hash_cache) or {}
+    hashes, new_cache, hashed = hash_assets(
+        [os.path.join(destination, item) for item in items], cache, workers)
+    if hash_cache:
+        write_json(hash_cache, new_cache)
+
+    manifest_path = os.path.join(destination, ASSET_MANIFEST_NAME)
+    old_map = read_json(manifest_path) or {}
+    asset_map = {}
+    copied = 0
+    for item in items:
+        item_path = os.path.join(destination, item)
+        name = fingerprint_name(item, hashes[item_path])
+        asset_map[url_path(item)] = url_path(name)
+        destination_path = os.path.join(destination, name)
+        # the name changes with the contents, so an existing file is current
+        if os.path.isfile(destination_path):
+            continue
+        print(f"Copying '{item_path}' to '{destination_path}'")
+        os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+        shutil.copy2(item_path, destination_path)
+        copied += 1
+
+    removed = 0
+    for name in sorted(set(old_map.values()) - set(asset_map.values())):
+        destination_path = os.path.join(destination, *name.split("/"))
+        if os.path.isfile(destination_path):
+            print(f"Removing old fingerprinted asset '{destination_path}'")
+            os.remove(destination_path)
+            remove_empty_dirs(os.path.dirname(destination_path), destination)
+            removed += 1
+
+    write_json(manifest_path, asset_map)
+    print(f"Fingerprinted {len(items)} assets ({hashed} hashed, "
+          f"{copied} copied, {removed} removed).")
+    return asset_map
@@ -0,0 +1,74 @@
+import os
+import sys
+import tracemalloc
+
+from functions import markdown_to_html_node, text_to_textnodes
+from htmlnode import HtmlNode
+from bench_parser import count_nodes
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_sample_markdown():
+    documents = []
+    for root, _, names in os.walk(os.path.join(REPO_DIR, "content")):
+        for name in sorted(names):
+            if name.endswith(".md"):
+                with open(os.path.join(root, name)) as file:
+                    documents.append(file.read())
+    return documents
+
+
+def measure(build, copies):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build(copies)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return kept, after - before
+
+
+def build_html_trees(documents, copies):
+    return [markdown_to_html_node(markdown)
+            for _ in range(copies) for markdown in documents]
+
+
+def inline_lines(documents):
+    lines = []
+    for markdown in documents:
+        for line in markdown.splitlines():
+            try:
+                text_to_textnodes(line)
+            except Exception:
+                # code fences and the like aren't inline markdown
+                continue
+            lines.append(line)
+    return lines
+
+
+def build_text_nodes(lines, copies):
+    return [text_to_textnodes(line) for _ in range(copies) for line in lines]
+
+
+def main():
+    copies = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    documents = load_sample_markdown()
+
+    trees, tree_bytes = measure(
+        lambda n: build_html_trees(documents, n), copies)
+    html_nodes = sum(count_nodes(tree) for tree in trees)
+    print(f"HtmlNode trees: {len(trees)} documents, {html_nodes} nodes, "
+          f"{tree_bytes / 1024:.0f} KiB, {tree_bytes / html_nodes:.1f} bytes/node")
+
+    runs, text_bytes = measure(
+        lambda n: build_text_nodes(inline_lines(documents), n), copies)
+    text_nodes = sum(len(nodes) for nodes in runs)
+    print(f"TextNode lists: {text_nodes} nodes, "
+          f"{text_bytes / 1024:.0f} KiB, {text_bytes / text_nodes:.1f} bytes/node")
+
+    slotted = not hasattr(HtmlNode(), "__dict__")
+    print(f"HtmlNode uses __slots__: {slotted}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import time
+
+from functions import (text_to_textnodes, markdown_to_blocks, block_to_block_type,
+                       markdown_to_html_node, BlockType)
+from synthetic import generate_markdown
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        count += 1
+        stack.extend(current.children)
+    return count
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def run_benchmarks(markdown, repeat):
+    blocks = markdown_to_blocks(markdown)
+    inline_blocks = [block.replace("\n", " ") for block in blocks
+                     if block_to_block_type(block) == BlockType.PARAGRAPH]
+    tree = markdown_to_html_node(markdown)
+    inline_bytes = sum(len(block.encode()) for block in inline_blocks)
+    inline_nodes = sum(len(text_to_textnodes(block))
+                       for block in inline_blocks)
+    html_bytes = len(tree.to_html().encode())
+    markdown_bytes = len(markdown.encode())
+    tree_nodes = count_nodes(tree)
+
+    # (name, function, bytes processed, nodes produced) per run
+    stages = [
+        ("text_to_textnodes",
+         lambda: [text_to_textnodes(block) for block in inline_blocks],
+         inline_bytes, inline_nodes),
+        ("markdown_to_blocks",
+         lambda: markdown_to_blocks(markdown),
+         markdown_bytes, len(blocks)),
+        ("block_to_block_type",
+         lambda: [block_to_block_type(block) for block in blocks],
+         markdown_bytes, len(blocks)),
+        ("markdown_to_html_node",
+         lambda: markdown_to_html_node(markdown),
+         markdown_bytes, tree_nodes),
+        ("to_html",
+         lambda: tree.to_html(),
+         html_bytes, tree_nodes),
+    ]
+
+    results = []
+    for name, function, size, nodes in stages:
+        elapsed = best_time(function, repeat)
+        results.append({
+            "name": name,
+            "seconds": elapsed,
+            "mb_per_second": size / elapsed / 1e6,
+            "nodes_per_second": nodes / elapsed,
+        })
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Time the parser and renderer on synthetic markdown.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sections", type=int, default=200)
+    parser.add_argument("--headings", type=int, default=1,
+                        help="headings per section")
+    parser.add_argument("--paragraphs", type=int, default=3,
+                        help="paragraphs per section")
+    parser.add_argument("--paragraph-words", type=int, default=80)
+    parser.add_argument("--link-density", type=float, default=0.05,
+                        help="chance that a word is a link, image or emphasis")
+    parser.add_argument("--list-length", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="runs per stage, the best one is reported")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    markdown = generate_markdown(
+        seed=args.seed, sections=args.sections, headings=args.headings,
+        paragraphs=args.paragraphs, paragraph_words=args.paragraph_words,
+        link_density=args.link_density, list_length=args.list_length)
+    print(f"Synthetic document: {len(markdown.encode()) / 1e6:.2f} MB")
+    print(f"{'stage':<24}{'ms':>10}{'MB/s':>10}{'nodes/s':>14}")
+    for result in run_benchmarks(markdown, args.repeat):
+        print(f"{result['name']:<24}{result['seconds'] * 1000:>10.2f}"
+              f"{result['mb_per_second']:>10.2f}{result['nodes_per_second']:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
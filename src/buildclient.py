@@ -0,0 +1,49 @@
+import os
+import sys
+import json
+import socket
+import argparse
+
+# The client only needs the standard library, so a build request costs one
+# small interpreter start; the site code stays loaded in the daemon.
+DEFAULT_SOCKET_PATH = ".cache/build.sock"
+
+
+def request_build(argv, socket_path=DEFAULT_SOCKET_PATH, output=None):
+    # sends main.py's arguments to a serve-builds daemon, echoes what the
+    # build prints as it arrives and returns the build's exit status
+    output = output or sys.stdout
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        request = {"cwd": os.getcwd(), "argv": list(argv)}
+        connection.sendall((json.dumps(request) + "\n").encode())
+        with connection.makefile("rb") as replies:
+            for line in replies:
+                message = json.loads(line)
+                if "status" in message:
+                    return message["status"]
+                output.write(message["output"])
+                output.flush()
+    print("The build server closed the connection before the build finished.")
+    return 1
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Ask a running serve-builds daemon to build the site. "
+                    "Any other arguments are passed on as for main.py.",
+        allow_abbrev=False)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH,
+                        help="the daemon's Unix socket")
+    args, build_args = parser.parse_known_args()
+    try:
+        status = request_build(build_args, args.socket)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No build server on '{args.socket}'; start one with "
+              f"'python3 src/main.py serve-builds'.")
+        status = 2
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
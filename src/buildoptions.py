@@ -0,0 +1,38 @@
+import copy
+
+from compress import DEFAULT_MIN_SIZE
+
+
+class BuildOptions:
+    # The settings a build threads from the command line down to every page.
+    # generate_page and its streamed and profiled variants, the recursive
+    # build, the watcher and main.py all take this one object, so a new
+    # setting is added here rather than to each of their signatures.
+    def __init__(self, basepath="/", variables=None, jobs=1, cache_dir=None,
+                 stream_threshold=None, asset_map=None, minify=False, static_dir=None,
+                 index_path=None, site_url=None, search=False, check_links=False,
+                 fingerprint=False, compress=False, compress_min_size=DEFAULT_MIN_SIZE):
+        self.basepath = basepath
+        self.variables = variables or {}
+        self.jobs = jobs
+        self.cache_dir = cache_dir
+        self.stream_threshold = stream_threshold
+        self.asset_map = asset_map
+        self.minify = minify
+        # where root-relative image urls are looked up for their sizes
+        self.static_dir = static_dir
+        self.index_path = index_path
+        self.site_url = site_url
+        self.search = search
+        self.check_links = check_links
+        self.fingerprint = fingerprint
+        self.compress = compress
+        self.compress_min_size = compress_min_size
+
+    def replace(self, **changes):
+        options = copy.copy(self)
+        for name, value in changes.items():
+            if not hasattr(options, name):
+                raise TypeError(f"unknown build option '{name}'")
+            setattr(options, name, value)
+        return options
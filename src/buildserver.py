@@ -0,0 +1,165 @@
+import os
+import sys
+import json
+import socket
+import argparse
+import traceback
+import socketserver
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from buildclient import DEFAULT_SOCKET_PATH
+from main import parse_args, build
+
+
+class ClientOutput:
+    # a text stream that forwards each write to the client as it happens
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def send(self, message):
+        if self.wfile is None:
+            return
+        try:
+            self.wfile.write((json.dumps(message) + "\n").encode())
+            self.wfile.flush()
+        except OSError:
+            # the client went away; finish the build without it
+            self.wfile = None
+
+    def write(self, text):
+        if text:
+            self.send({"output": text})
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def restore_streams():
+    # workers fork while a build's output points at its client; anything
+    # they print outside a page goes to the daemon's own streams instead
+    sys.stdout = sys.__stdout__
+    sys.stderr = sys.__stderr__
+
+
+def run_build(request, server):
+    # the exit status main.py would have finished with
+    cwd = request.get("cwd")
+    if cwd is None or os.path.realpath(cwd) != server.root:
+        print(f"This build server builds '{server.root}', not '{cwd}'.")
+        return 2
+    try:
+        args = parse_args(request.get("argv", []))
+    except SystemExit as error:
+        # --help, or arguments argparse rejected
+        return error.code or 0
+    if args.watch:
+        print("--watch can't be used through the build server.")
+        return 2
+    jobs = args.jobs or os.cpu_count() or 1
+    try:
+        broken = build(args, server.page_pool(jobs))
+    except BrokenProcessPool:
+        traceback.print_exc()
+        server.close_pools()
+        return 1
+    except SystemExit as error:
+        if isinstance(error.code, str):
+            print(error.code)
+            return 1
+        return error.code or 0
+    except Exception:
+        traceback.print_exc()
+        return 1
+    return 1 if broken else 0
+
+
+class BuildHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        output = ClientOutput(self.wfile)
+        try:
+            request = json.loads(line)
+        except ValueError:
+            output.send({"output": "Malformed build request.\n"})
+            output.send({"status": 2})
+            return
+        # builds run one at a time: they share the working directory, the
+        # process-wide stdout and the caches this daemon keeps warm
+        os.chdir(self.server.root)
+        with redirect_stdout(output), redirect_stderr(output):
+            status = run_build(request, self.server)
+        output.send({"status": status})
+
+
+def remove_stale_socket(socket_path):
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+            return
+    raise SystemExit(f"A build server is already listening on '{socket_path}'.")
+
+
+class BuildServer(socketserver.UnixStreamServer):
+    def __init__(self, socket_path, root):
+        super().__init__(socket_path, BuildHandler)
+        self.root = root
+        # one render pool per --jobs value, started on first use and kept,
+        # so its workers hold on to their template and image caches
+        self.pools = {}
+
+    def page_pool(self, jobs):
+        if jobs <= 1:
+            return None
+        if jobs not in self.pools:
+            self.pools[jobs] = ProcessPoolExecutor(max_workers=jobs,
+                                                   initializer=restore_streams)
+        return self.pools[jobs]
+
+    def close_pools(self):
+        for pool in self.pools.values():
+            pool.shutdown(cancel_futures=True)
+        self.pools = {}
+
+    def server_close(self):
+        super().server_close()
+        self.close_pools()
+
+
+def make_build_server(socket_path=DEFAULT_SOCKET_PATH, root=None):
+    directory = os.path.dirname(socket_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    remove_stale_socket(socket_path)
+    return BuildServer(socket_path, os.path.realpath(root or os.getcwd()))
+
+
+def serve_builds(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="main.py serve-builds",
+        description="Keep the site generator loaded and build on request "
+                    "from src/buildclient.py.")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH,
+                        help="the Unix socket to listen on")
+    args = parser.parse_args(argv)
+    server = make_build_server(args.socket)
+    print(f"Serving builds of '{server.root}' on '{args.socket}'.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped build server.")
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    serve_builds(sys.argv[1:])
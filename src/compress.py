@@ -0,0 +1,158 @@
+import os
+import gzip
+from concurrent.futures import ProcessPoolExecutor
+
+from manifest import read_json, write_json
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE = {".html", ".css", ".js", ".json", ".svg", ".xml", ".txt"}
+ENCODED_SUFFIXES = (".gz", ".br", ".zst")
+DEFAULT_MIN_SIZE = 1024
+# the siblings this stage wrote, so files that arrive precompressed from
+# static/ are never overwritten or removed
+COMPRESS_MANIFEST_NAME = ".compress-manifest.json"
+
+
+def gzip_bytes(data):
+    # mtime=0 keeps the output identical from one build to the next
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def brotli_bytes(data):
+    return brotli.compress(data, quality=11)
+
+
+def zstd_bytes(data):
+    return zstandard.ZstdCompressor(level=19).compress(data)
+
+
+def available_encoders():
+    encoders = [(".gz", gzip_bytes)]
+    if brotli is not None:
+        encoders.append((".br", brotli_bytes))
+    if zstandard is not None:
+        encoders.append((".zst", zstd_bytes))
+    return encoders
+
+
+def find_compressible(directory, min_size):
+    files = []
+    for root, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if name.startswith("."):
+                continue
+            if os.path.splitext(name)[1] not in COMPRESSIBLE:
+                continue
+            path = os.path.join(root, name)
+            if os.path.getsize(path) >= min_size:
+                files.append(path)
+    return files
+
+
+def sibling_current(path, sibling_path):
+    # siblings get their source's mtime, so any difference means the
+    # source was written again since
+    try:
+        return os.stat(sibling_path).st_mtime_ns == os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def write_sibling(path, sibling_path, data):
+    temp_path = f"{sibling_path}.tmp"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    stat = os.stat(path)
+    os.utime(temp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    os.replace(temp_path, sibling_path)
+
+
+def compress_file(job):
+    # returns (path, original size, [(suffix, compressed size, written)])
+    path, foreign = job
+    results = []
+    data = None
+    for suffix, encode in available_encoders():
+        sibling_path = path + suffix
+        if suffix in foreign:
+            continue
+        if sibling_current(path, sibling_path):
+            results.append((suffix, os.path.getsize(sibling_path), False))
+            continue
+        if data is None:
+            with open(path, "rb") as file:
+                data = file.read()
+        compressed = encode(data)
+        if len(compressed) >= len(data):
+            # not worth serving, and an old sibling would now be stale
+            if os.path.exists(sibling_path):
+                os.remove(sibling_path)
+            continue
+        write_sibling(path, sibling_path, compressed)
+        results.append((suffix, len(compressed), True))
+    return path, os.path.getsize(path), results
+
+
+def foreign_suffixes(path, owned):
+    # siblings already there that this stage didn't write
+    return {suffix for suffix in ENCODED_SUFFIXES
+            if path + suffix not in owned and os.path.exists(path + suffix)}
+
+
+def remove_orphaned_siblings(directory, old_siblings, siblings):
+    # a sibling whose source is gone, or has dropped under the minimum
+    # size, would otherwise keep being served instead of the real file
+    removed = 0
+    for sibling_path in sorted(set(old_siblings) - set(siblings)):
+        if os.path.exists(sibling_path):
+            print(f"Removing orphaned '{sibling_path}'")
+            os.remove(sibling_path)
+            removed += 1
+    return removed
+
+
+def compress_output(directory="docs", jobs=1, min_size=DEFAULT_MIN_SIZE):
+    manifest_path = os.path.join(directory, COMPRESS_MANIFEST_NAME)
+    old_siblings = {os.path.join(directory, item)
+                    for item in read_json(manifest_path) or []}
+    files = find_compressible(directory, min_size)
+    file_jobs = [(path, foreign_suffixes(path, old_siblings)) for path in files]
+    if jobs <= 1 or len(file_jobs) < 2:
+        results = [compress_file(job) for job in file_jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(compress_file, file_jobs,
+                                    chunksize=max(1, len(file_jobs) // (jobs * 4))))
+    siblings = {path + suffix
+                for path, _, file_siblings in results
+                for suffix, _, _ in file_siblings}
+    removed = remove_orphaned_siblings(directory, old_siblings, siblings)
+    write_json(manifest_path, sorted(
+        os.path.relpath(path, directory) for path in siblings))
+
+    # savings are reported per encoding, each one is an alternative to the
+    # same original bytes
+    totals = {}
+    written = 0
+    for _, original_size, file_siblings in results:
+        for suffix, size, was_written in file_siblings:
+            before, after = totals.get(suffix, (0, 0))
+            totals[suffix] = (before + original_size, after + size)
+            written += was_written
+    print(f"Compressed {len(files)} files ({written} siblings written, "
+          f"{removed} removed).")
+    for suffix, (before, after) in sorted(totals.items()):
+        saved = before - after
+        print(f"  {suffix}: {before} -> {after} bytes, saved {saved} "
+              f"({saved / before:.0%}).")
+    return totals
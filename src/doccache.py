@@ -0,0 +1,72 @@
+import os
+import zlib
+import struct
+import hashlib
+
+DEFAULT_CACHE_DIR = os.path.join(".cache", "documents")
+# entry layout: magic, format, title length, title (utf-8), zlib'd body (utf-8)
+HEADER = struct.Struct("<4sBI")
+MAGIC = b"SSGD"
+FORMAT = 1
+
+
+def document_key(markdown, parser_version):
+    digest = hashlib.sha256(f"{parser_version}\0".encode())
+    digest.update(markdown.encode())
+    return digest.hexdigest()
+
+
+def encode_document(title, body):
+    title_bytes = title.encode()
+    return (HEADER.pack(MAGIC, FORMAT, len(title_bytes)) + title_bytes +
+            zlib.compress(body.encode(), 6))
+
+
+def decode_document(data):
+    magic, version, title_length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT:
+        raise ValueError("Not a document cache entry")
+    start = HEADER.size
+    title = data[start:start + title_length].decode()
+    body = zlib.decompress(data[start + title_length:]).decode()
+    return title, body
+
+
+class DocumentCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+
+    def path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.bin")
+
+    def get(self, key):
+        try:
+            with open(self.path(key), "rb") as file:
+                return decode_document(file.read())
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, zlib.error, struct.error):
+            # a damaged entry is just a miss, the page gets parsed again
+            return None
+
+    def put(self, key, title, body):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(encode_document(title, body))
+        os.replace(temp_path, path)
+
+    def prune(self, keys):
+        # drops every entry whose key isn't in keys, returns how many went
+        removed = 0
+        try:
+            directories = [entry for entry in os.scandir(self.directory) if entry.is_dir()]
+        except FileNotFoundError:
+            return 0
+        for directory in directories:
+            for entry in os.scandir(directory.path):
+                if entry.name.endswith(".bin") and entry.name[:-4] not in keys:
+                    os.remove(entry.path)
+                    removed += 1
+        return removed
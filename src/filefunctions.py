@@ -1,5 +1,10 @@
 import os
 import shutil
+from manifest import hash_file, read_json, write_json, remove_empty_dirs
+from minify import minify_css
+from writer import write_if_changed
+
+STATIC_MANIFEST_NAME = ".static-manifest.json"
 
 
 def delete_public_dir():
@@ -32,6 +37,96 @@ def copy_static_to_public():
     delete_public_dir()
     os.mkdir("docs")
     copy_file_to_public("static", "docs")
+    save_static_manifest("docs", list_static_files("static"))
+
+
+def list_static_files(source):
+    files = []
+    for root, dirs, names in os.walk(source):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            files.append(os.path.relpath(path, source))
+    return files
+
+
+def asset_changed(source_path, destination_path, checksum=False):
+    if not os.path.isfile(destination_path):
+        return True
+    source_stat = os.stat(source_path)
+    destination_stat = os.stat(destination_path)
+    if source_stat.st_size != destination_stat.st_size:
+        return True
+    if checksum:
+        return hash_file(source_path) != hash_file(destination_path)
+    # copy2 carries the mtime over, so an untouched asset matches exactly
+    return source_stat.st_mtime_ns != destination_stat.st_mtime_ns
+
+
+def is_minifiable(item):
+    return item.endswith(".css")
+
+
+def copy_static_file(source, destination, item, minify=False):
+    item_path = os.path.join(source, item)
+    destination_path = os.path.join(destination, item)
+    if minify and is_minifiable(item):
+        with open(item_path) as file:
+            css = file.read()
+        minified = minify_css(css)
+        if not write_if_changed(destination_path, [minified]):
+            return False
+        print(f"Minified '{item_path}' to '{destination_path}' "
+              f"({len(css.encode())} -> {len(minified.encode())} bytes)")
+        return True
+    print(f"Copying '{item_path}' to '{destination_path}'")
+    os.makedirs(os.path.dirname(destination_path), exist_ok=True)
+    shutil.copy2(item_path, destination_path)
+    return True
+
+
+def remove_static_file(destination, item):
+    destination_path = os.path.join(destination, item)
+    if not os.path.isfile(destination_path):
+        return False
+    print(f"Removing orphaned asset '{destination_path}'")
+    os.remove(destination_path)
+    remove_empty_dirs(os.path.dirname(destination_path), destination)
+    return True
+
+
+def save_static_manifest(destination, files):
+    write_json(os.path.join(destination, STATIC_MANIFEST_NAME), sorted(files))
+
+
+def sync_static_to_public(source="static", destination="docs", checksum=False, minify=False):
+    manifest_path = os.path.join(destination, STATIC_MANIFEST_NAME)
+    old_files = read_json(manifest_path) or []
+    files = list_static_files(source)
+    copied = 0
+
+    for item in files:
+        item_path = os.path.join(source, item)
+        destination_path = os.path.join(destination, item)
+        # a minified copy never matches its source's size, so it's rebuilt
+        # and left alone by write_if_changed when the result is the same
+        minified = minify and is_minifiable(item)
+        if not minified and not asset_changed(item_path, destination_path, checksum):
+            continue
+        if copy_static_file(source, destination, item, minify):
+            copied += 1
+
+    # only files we copied on an earlier run are ours to delete, anything
+    # else under destination belongs to the page generator
+    removed = 0
+    for item in sorted(set(old_files) - set(files)):
+        if remove_static_file(destination, item):
+            removed += 1
+
+    save_static_manifest(destination, files)
+    print(f"Static sync: {copied} copied, {removed} removed, "
+          f"{len(files) - copied} unchanged.")
+    return copied, removed
 
 
 if __name__ == "__main__":
@@ -0,0 +1,60 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from functions import generate_pages_recursively
+from buildoptions import BuildOptions
+
+
+def write_file(path, contents, mtime=None):
+    # shared by the tests that lay out a small site in a temporary directory
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as file:
+        file.write(contents)
+    if mtime is not None:
+        os.utime(path, ns=(mtime, mtime))
+
+
+def png_bytes(width, height):
+    # just the signature and IHDR chunk, all a size lookup reads
+    return (b"\x89PNG\r\n\x1a\n" + struct.pack(">I", 13) + b"IHDR" +
+            struct.pack(">II", width, height) + b"\x08\x02\x00\x00\x00")
+
+
+class SiteTestCase(unittest.TestCase):
+    # A small site in a temporary directory, laid out the way main.py
+    # expects: template.html, content/, static/ and docs/, plus .cache/.
+    # Subclasses swap in their own template, pages and static files.
+    TEMPLATE = "{{ Title }}|{{ Content }}"
+    PAGES = {"index.md": "# Home"}
+    STATIC = {}
+    MTIME = None
+    BASEPATH = "/"
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+        self.content = os.path.join(self.root, "content")
+        self.static = os.path.join(self.root, "static")
+        self.docs = os.path.join(self.root, "docs")
+        self.template = os.path.join(self.root, "template.html")
+        self.index_path = os.path.join(self.root, ".cache", "site-index.sqlite")
+        self.cache_dir = os.path.join(self.root, ".cache", "documents")
+        write_file(self.template, self.TEMPLATE, self.MTIME)
+        for name, text in self.PAGES.items():
+            write_file(os.path.join(self.content, *name.split("/")), text, self.MTIME)
+        for name, text in self.STATIC.items():
+            write_file(os.path.join(self.static, *name.split("/")), text, self.MTIME)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build(self, basepath=None, force=False, **options):
+        return generate_pages_recursively(
+            self.content, self.template, self.docs,
+            BuildOptions(basepath or self.BASEPATH, **options), force=force)
+
+    def read(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as file:
+            return file.read()
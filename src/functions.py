@@ -1,13 +1,36 @@
+import io
 import re
 import os
+import time
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 from textnode import TextNode, TextType
 from leafnode import LeafNode
 from parentnode import ParentNode
 from htmlnode import HtmlNode
-
-
-def text_node_to_html_node(text_node):
+from template import load_template, select_template
+from profiler import StageTimer, profile_stage
+from doccache import DocumentCache, document_key
+from writer import write_if_changed, WriteStats
+from minify import HtmlMinifier
+from siteindex import open_index, update_site_index
+from search import weigh_title, update_search_index
+from linkindex import update_link_index
+from assets import asset_map_digest
+from pagenotes import PageNotes, NOTES_KEY_SUFFIX
+from manifest import (hash_file, new_manifest, load_manifest, save_manifest,
+                      manifest_matches, is_page_current, record_template,
+                      remove_orphaned_outputs)
+
+# bump whenever a parser change alters the HTML a document renders to, so
+# documents cached by an older parser aren't reused
+PARSER_VERSION = 2
+
+
+def text_node_to_html_node(text_node, notes=None):
+    if notes is not None:
+        notes.add(text_node)
     match (text_node.text_type):
         case TextType.TEXT:
             return LeafNode(None, text_node.text)
@@ -20,27 +43,43 @@ def text_node_to_html_node(text_node):
         case TextType.LINK:
             return LeafNode("a", text_node.text, {"href": f"{text_node.url}"})
         case TextType.IMAGE:
-            return LeafNode("img", "", {"src": f"{text_node.url}", "alt": f"{text_node.text}"})
+            props = {"src": f"{text_node.url}", "alt": f"{text_node.text}"}
+            size = None if notes is None else notes.image_size(text_node.url)
+            if size is not None:
+                # reserve the box before the image loads so the page doesn't jump
+                props["width"] = str(size[0])
+                props["height"] = str(size[1])
+            props["loading"] = "lazy"
+            props["decoding"] = "async"
+            return LeafNode("img", "", props)
+
+
+INLINE_DELIMITERS = (
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+    ("`", TextType.CODE),
+)
+IMAGE_OR_LINK = re.compile(r"(!?)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+
+
+def split_delimited(text, delimiter):
+    split_text = text.split(delimiter)
+    if len(split_text) % 2 == 0:
+        raise Exception(
+            f"Invalid markdown syntax, unmatched: '{delimiter}'")
+    return split_text
 
 
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     for node in old_nodes:
         if node.text_type == TextType.TEXT:
-            split_nodes = []
-            split_text = node.text.split(delimiter)
-
-            if len(split_text) % 2 == 0:
-                raise Exception(
-                    f"Invalid markdown syntax, unmatched: '{delimiter}'")
-
+            split_text = split_delimited(node.text, delimiter)
             for i in range(0, len(split_text)):
                 node_type = text_type
                 if i % 2 == 0:
                     node_type = TextType.TEXT
-                split_nodes.append(TextNode(split_text[i], node_type))
-
-            new_nodes.extend(split_nodes)
+                new_nodes.append(TextNode(split_text[i], node_type))
         else:
             new_nodes.append(node)
     return new_nodes
@@ -50,78 +89,120 @@ def extract_markdown_images(text):
     return re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
 
 
+def extract_markdown_links(text):
+    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+
+
+def append_link_piece(text, start, end, links, nodes):
+    if not links:
+        nodes.append(TextNode(text[start:end], TextType.TEXT))
+        return
+    position = start
+    for link in links:
+        nodes.append(TextNode(text[position:link.start()], TextType.TEXT))
+        nodes.append(TextNode(link.group(2), TextType.LINK, link.group(3)))
+        position = link.end()
+    if position < end:
+        nodes.append(TextNode(text[position:end], TextType.TEXT))
+
+
+def append_images_and_links(text, nodes, images=True, links=True):
+    # One finditer pass over the text. Images split the text into pieces
+    # first and links then split each piece, which is the order the old
+    # split_nodes_image/split_nodes_link passes ran in, so the text nodes
+    # between matches come out the same (leading ones kept even if empty,
+    # a trailing one only if it has text).
+    piece_start = 0
+    piece_links = []
+    found = False
+    for match in IMAGE_OR_LINK.finditer(text):
+        if match.group(1):
+            if not images:
+                continue
+            found = True
+            append_link_piece(text, piece_start, match.start(),
+                              piece_links, nodes)
+            nodes.append(
+                TextNode(match.group(2), TextType.IMAGE, match.group(3)))
+            piece_start = match.end()
+            piece_links = []
+        elif links:
+            found = True
+            piece_links.append(match)
+
+    if not found:
+        nodes.append(TextNode(text, TextType.TEXT))
+    elif piece_start < len(text):
+        append_link_piece(text, piece_start, len(text), piece_links, nodes)
+
+
 def split_nodes_image(old_nodes):
     new_nodes = []
     for node in old_nodes:
         if node.text_type == TextType.TEXT:
-            images = extract_markdown_images(node.text)
-            if len(images) > 0:
-                image_nodes = []
-                image = images[0]
-                split_text = node.text.split(
-                    f"![{image[0]}]({image[1]})", 1)
-                image_nodes.append(TextNode(split_text[0], TextType.TEXT))
-                image_nodes.append(
-                    TextNode(image[0], TextType.IMAGE, image[1]))
-                if len(split_text[1]) != 0:
-                    image_nodes.append(
-                        TextNode(split_text[1], TextType.TEXT))
-                split_nodes = split_nodes_image(image_nodes)
-                new_nodes.extend(split_nodes)
-            else:
-                new_nodes.append(node)
+            append_images_and_links(node.text, new_nodes, links=False)
         else:
             new_nodes.append(node)
     return new_nodes
 
 
-def extract_markdown_links(text):
-    return re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
-
-
 def split_nodes_link(old_nodes):
     new_nodes = []
     for node in old_nodes:
         if node.text_type == TextType.TEXT:
-            links = extract_markdown_links(node.text)
-            if len(links) > 0:
-                link_nodes = []
-                link = links[0]
-                split_text = node.text.split(
-                    f"[{link[0]}]({link[1]})", 1)
-                link_nodes.append(TextNode(split_text[0], TextType.TEXT))
-                link_nodes.append(
-                    TextNode(link[0], TextType.LINK, link[1]))
-                if len(split_text[1]) != 0:
-                    link_nodes.append(
-                        TextNode(split_text[1], TextType.TEXT))
-                split_nodes = split_nodes_link(link_nodes)
-                new_nodes.extend(split_nodes)
-            else:
-                new_nodes.append(node)
+            append_images_and_links(node.text, new_nodes, images=False)
         else:
             new_nodes.append(node)
     return new_nodes
 
 
-def text_to_textnodes(text):
-    nodes = [TextNode(text, TextType.TEXT)]
-    nodes = split_nodes_delimiter(nodes, '**', TextType.BOLD)
-    nodes = split_nodes_delimiter(nodes, '_', TextType.ITALIC)
-    nodes = split_nodes_delimiter(nodes, '`', TextType.CODE)
-    nodes = split_nodes_image(nodes)
-    nodes = split_nodes_link(nodes)
+def tokenize_inline(text, nodes, level=0):
+    if level == len(INLINE_DELIMITERS):
+        append_images_and_links(text, nodes)
+        return
+    delimiter, text_type = INLINE_DELIMITERS[level]
+    for i, part in enumerate(split_delimited(text, delimiter)):
+        if i % 2 == 0:
+            tokenize_inline(part, nodes, level + 1)
+        else:
+            nodes.append(TextNode(part, text_type))
+
 
+def text_to_textnodes(text):
+    nodes = []
+    tokenize_inline(text, nodes)
     return nodes
 
 
+def iter_numbered_blocks(lines):
+    # An empty line ends a block, which is where splitting the whole text on
+    # "\n\n" used to cut. Lines may come from a file (with their newline) or
+    # from str.split("\n") (without), so only one trailing "\n" is dropped.
+    # Each block comes with the 1-based number of its first line, for error
+    # reports.
+    block_lines = []
+    first_line = 0
+    for number, line in enumerate(lines, 1):
+        if line.endswith("\n"):
+            line = line[:-1]
+        if line:
+            if not block_lines:
+                first_line = number
+            block_lines.append(line)
+        elif block_lines:
+            yield first_line, "\n".join(block_lines).strip()
+            block_lines = []
+    if block_lines:
+        yield first_line, "\n".join(block_lines).strip()
+
+
+def iter_markdown_blocks(lines):
+    for _, block in iter_numbered_blocks(lines):
+        yield block
+
+
 def markdown_to_blocks(markdown):
-    split_file = markdown.split("\n\n")
-    final_blocks = []
-    for line in split_file:
-        if len(line) > 0:
-            final_blocks.append(line.strip())
-    return final_blocks
+    return list(iter_markdown_blocks(markdown.split("\n")))
 
 
 class BlockType(Enum):
@@ -133,10 +214,21 @@ class BlockType(Enum):
     ORDERED_LIST = "ol"
 
 
+def heading_level(line):
+    level = 0
+    while level < len(line) and line[level] == "#":
+        level += 1
+    if 1 <= level <= 6 and line[level:level + 1] == " ":
+        return level
+    return 0
+
+
 def block_to_block_type(markdown):
-    if re.match(r"^#{1,6} ", markdown):
+    if heading_level(markdown):
         return BlockType.HEADING
-    if re.match(r"^```[\s\S]*?```$", markdown):
+    # "```" ... "```", allowing one trailing newline like the old regex's $
+    fenced = markdown[:-1] if markdown.endswith("\n") else markdown
+    if len(fenced) >= 6 and fenced.startswith("```") and fenced.endswith("```"):
         return BlockType.CODE
 
     starts_with_quote = True
@@ -146,11 +238,11 @@ def block_to_block_type(markdown):
     for line in markdown.splitlines():
         if not (starts_with_ordered or starts_with_quote or starts_with_unordered):
             break
-        if not re.match(r"^>", line):
+        if not line.startswith(">"):
             starts_with_quote = False
-        if not re.match(r"^- ", line):
+        if not line.startswith("- "):
             starts_with_unordered = False
-        if not re.match(rf"^{counter}\. ", line):
+        if starts_with_ordered and not line.startswith(f"{counter}. "):
             starts_with_ordered = False
         counter += 1
 
@@ -164,137 +256,478 @@ def block_to_block_type(markdown):
     return BlockType.PARAGRAPH
 
 
-def markdown_to_html_node(markdown):
-    html_nodes = []
-    blocks = markdown_to_blocks(markdown)
-    # print(f"All of the blocks: {blocks}")
-    for block in blocks:
+def block_to_html_node(block, block_type=None, notes=None):
+    if block_type is None:
         block_type = block_to_block_type(block)
-        if block_type == BlockType.CODE:
-            children = text_to_code(block)
-            code_node = ParentNode(block_type.value, children)
-            html_nodes.append(ParentNode("pre", [code_node]))
-        elif block_type == BlockType.QUOTE:
-            children = text_to_quote(block)
-            html_nodes.append(ParentNode(block_type.value, children))
-        elif block_type == BlockType.UNORDERED_LIST:
-            children = text_to_unordered_list(block)
-            html_nodes.append(ParentNode(block_type.value, children))
-        elif block_type == BlockType.ORDERED_LIST:
-            children = text_to_ordered_list(block)
-            html_nodes.append(ParentNode(block_type.value, children))
-        elif block_type == BlockType.HEADING:
-            heading_size, heading_text = text_to_heading(block)
-            html_nodes.append(
-                LeafNode(f"{block_type.value}{heading_size}", heading_text))
-        else:
-            children = text_to_children(block)
-            html_nodes.append(ParentNode(block_type.value, children))
-    html_doc = ParentNode("div", html_nodes)
-    # print(f"Full structure:\n {html_doc}")
-    # print(f"Output:\n{repr(html_doc.to_html())}")
-    return html_doc
-
-
-def text_to_children(text):
+    if block_type == BlockType.CODE:
+        children = text_to_code(block, notes)
+        code_node = ParentNode(block_type.value, children)
+        return ParentNode("pre", [code_node])
+    if block_type == BlockType.QUOTE:
+        return ParentNode(block_type.value, text_to_quote(block, notes))
+    if block_type == BlockType.UNORDERED_LIST:
+        return ParentNode(block_type.value, text_to_unordered_list(block, notes))
+    if block_type == BlockType.ORDERED_LIST:
+        return ParentNode(block_type.value, text_to_ordered_list(block, notes))
+    if block_type == BlockType.HEADING:
+        heading_size, heading_text = text_to_heading(block)
+        if notes is not None:
+            notes.add(TextNode(heading_text, TextType.TEXT))
+        return LeafNode(f"{block_type.value}{heading_size}", heading_text)
+    return ParentNode(block_type.value, text_to_children(block, notes))
+
+
+def iter_block_nodes(lines, notes=None):
+    if notes is not None and notes.wants_lines():
+        for line, block in iter_numbered_blocks(lines):
+            notes.start_block(line, block)
+            yield block_to_html_node(block, notes=notes)
+        return
+    for block in iter_markdown_blocks(lines):
+        yield block_to_html_node(block, notes=notes)
+
+
+def markdown_to_html_node(markdown, notes=None):
+    return ParentNode("div", list(iter_block_nodes(markdown.split("\n"), notes)))
+
+
+def file_to_html_node(path, notes=None):
+    with open(path) as file:
+        return ParentNode("div", list(iter_block_nodes(file, notes)))
+
+
+def text_to_children(text, notes=None):
     html_nodes = []
     nodes = text_to_textnodes(text.replace("\n", " "))
     for node in nodes:
-        created_node = text_node_to_html_node(node)
+        created_node = text_node_to_html_node(node, notes)
         html_nodes.append(created_node)
     return html_nodes
 
 
-def text_to_code(text):
+def text_to_code(text, notes=None):
     cleaned_text = text.replace("```", "").lstrip()
-    text_node = text_node_to_html_node(TextNode(cleaned_text, TextType.TEXT))
+    text_node = text_node_to_html_node(TextNode(cleaned_text, TextType.TEXT), notes)
     return [text_node]
 
 
-def text_to_quote(text):
+def text_to_quote(text, notes=None):
     cleaned_text = text.replace("> ", "")
-    text_node = text_node_to_html_node(TextNode(cleaned_text, TextType.TEXT))
+    text_node = text_node_to_html_node(TextNode(cleaned_text, TextType.TEXT), notes)
     return [text_node]
 
 
-def text_to_unordered_list(text):
+def text_to_unordered_list(text, notes=None):
     list_nodes = []
     for line in text.splitlines():
         cleaned_text = line.replace("- ", "")
-        children = text_to_children(cleaned_text)
+        children = text_to_children(cleaned_text, notes)
         list_nodes.append(ParentNode("li", children))
     return list_nodes
 
 
-def text_to_ordered_list(text):
+def text_to_ordered_list(text, notes=None):
     list_nodes = []
     for line in text.splitlines():
         cleaned_text = line[3:]
-        children = text_to_children(cleaned_text)
+        children = text_to_children(cleaned_text, notes)
         list_nodes.append(ParentNode("li", children))
     return list_nodes
 
 
 def text_to_heading(text):
-    cleaned_text = ""
-    counter = 0
-    for ch in text:
-        if ch == "#":
-            counter += 1
-        else:
-            cleaned_text += ch
+    # every "#" counts towards the level and is dropped from the text
+    counter = text.count("#")
+    return counter, text.replace("#", "").lstrip()
 
-    return counter, cleaned_text.lstrip()
 
+def scan_file(path, notes):
+    # fills notes for pages an index lacks but this run didn't render, by
+    # the same block by block parse a large page streams through; the
+    # nodes themselves are thrown away
+    with open(path) as file:
+        for _ in iter_block_nodes(file, notes):
+            pass
+    return notes
 
-def extract_title(markdown):
-    for line in markdown.splitlines():
+
+def page_search_terms(from_path):
+    title = extract_title_from_file(from_path)
+    notes = scan_file(from_path, PageNotes(search=True))
+    return title, weigh_title(title, notes.terms)
+
+
+def page_references(from_path):
+    return scan_file(from_path, PageNotes(references=True)).references
+
+
+def extract_title_from_lines(lines):
+    for line in lines:
         if line.startswith("# "):
             return line[2:].strip()
     raise Exception("Markdown file does not contain a title")
 
 
-def generate_page(from_path, template_path, destination_path, basepath):
+def extract_title(markdown):
+    return extract_title_from_lines(markdown.splitlines())
+
+
+def document_version(markdown, notes=None):
+    # image sizes end up in the HTML, so a resized image has to miss too
+    sizes = []
+    if notes is not None:
+        sizes = [notes.image_size(url)
+                 for _, url in extract_markdown_images(markdown)]
+    return f"{PARSER_VERSION}:{sizes}"
+
+
+def timed_markdown_to_html_node(markdown, notes, timer):
+    # markdown_to_html_node with each stage run to completion so it can be
+    # timed on its own; inline_parse counts one call per block
+    with timer.stage("block_parse"):
+        blocks = list(iter_numbered_blocks(markdown.split("\n")))
+        block_types = [block_to_block_type(block) for _, block in blocks]
+    start = time.perf_counter()
+    children = []
+    for (line, block), block_type in zip(blocks, block_types):
+        if notes is not None:
+            notes.start_block(line, block)
+        children.append(block_to_html_node(block, block_type, notes))
+    timer.add("inline_parse", time.perf_counter() - start, len(blocks))
+    return ParentNode("div", children)
+
+
+def parse_document(markdown, cache_dir=None, notes=None, timer=None):
+    # timer, a StageTimer, is for --profile: the content comes back as one
+    # string with parsing, to_html and the cache timed separately
+    if cache_dir is not None:
+        cache = DocumentCache(cache_dir)
+        key = document_key(markdown, document_version(markdown, notes))
+        with profile_stage(timer, "cache"):
+            cached = cache.get(key)
+            if cached is not None and (notes is None or notes.load_cached(cache, key)):
+                return cached
+    if timer is None:
+        html_object = markdown_to_html_node(markdown, notes)
+    else:
+        html_object = timed_markdown_to_html_node(markdown, notes, timer)
+    title = extract_title(markdown)
+    if cache_dir is None and timer is None:
+        return title, html_object.iter_html()
+    with profile_stage(timer, "to_html"):
+        html_string = html_object.to_html()
+    if cache_dir is not None:
+        with profile_stage(timer, "cache"):
+            cache.put(key, title, html_string)
+            if notes is not None:
+                notes.save_cached(cache, key)
+    return title, html_string
+
+
+def extract_title_from_file(path):
+    with open(path) as file:
+        return extract_title_from_lines(file)
+
+
+def iter_file_html(path, notes=None):
+    # the whole document's div, one block at a time, without ever holding
+    # more than the current block and its nodes
+    with open(path) as file:
+        nodes = iter_block_nodes(file, notes)
+        first = next(nodes, None)
+        if first is None:
+            raise ValueError("Missing children object")
+        yield "<div>"
+        yield from first.iter_html()
+        for node in nodes:
+            yield from node.iter_html()
+        yield "</div>"
+
+
+def page_notes(options):
+    return PageNotes(options.static_dir, options.search, options.check_links)
+
+
+def generate_page_streaming(from_path, template_path, destination_path, options):
+    print(f"Streaming {from_path} to {destination_path} using {template_path}")
+    notes = page_notes(options)
+    template = load_template(template_path)
+    values = dict(options.variables)
+    # the title comes before the content in the template, so it takes a
+    # quick first pass that stops at the first "# " line
+    values["Title"] = extract_title_from_file(from_path)
+    values["Content"] = iter_file_html(from_path, notes)
+    chunks = template.iter_render(values, options.basepath, options.asset_map)
+    minifier = HtmlMinifier() if options.minify else None
+    if minifier is not None:
+        chunks = minifier.minify(chunks)
+    written = write_if_changed(destination_path, chunks)
+    return page_record(from_path, destination_path, values["Title"], written, notes,
+                       minifier)
+
+
+def page_record(from_path, destination_path, title, written, notes, minifier=None):
+    record = {"source": from_path, "output": destination_path, "title": title,
+              "written": written, "images": notes.images}
+    if notes.terms is not None:
+        record["search"] = (title, weigh_title(title, notes.terms))
+    if notes.references is not None:
+        record["references"] = notes.references
+    if notes.cache_key is not None:
+        record["cache_key"] = notes.cache_key
+    if minifier is not None:
+        record["minified"] = [minifier.size_in, minifier.size_out]
+    return record
+
+
+def generate_page(from_path, template_path, destination_path, options, profile=False):
+    stream_threshold = options.stream_threshold
+    if stream_threshold is not None and os.path.getsize(from_path) >= stream_threshold:
+        start = time.perf_counter()
+        record = generate_page_streaming(
+            from_path, template_path, destination_path, options)
+        if profile:
+            # a streamed page's stages interleave, so it is timed as a whole
+            # rather than loaded whole to time each stage
+            seconds = time.perf_counter() - start
+            record.update({
+                "seconds": seconds,
+                "bytes": os.path.getsize(from_path),
+                "cached": False,
+                "stages": {"stream": {"seconds": seconds, "calls": 1}},
+            })
+        return record
+    if profile:
+        return generate_page_profiled(
+            from_path, template_path, destination_path, options)
     print(
         f"Generating Markdown from {from_path} to {destination_path} using {template_path}")
+    notes = page_notes(options)
     markdown = get_file_contents(from_path)
-    template = get_file_contents(template_path)
+    template = load_template(template_path)
+    title, content = parse_document(markdown, options.cache_dir, notes)
 
-    html_object = markdown_to_html_node(markdown)
-    html_string = html_object.to_html()
-    title = extract_title(markdown)
+    values = dict(options.variables)
+    values["Title"] = title
+    values["Content"] = content
 
-    template_with_title = template.replace("{{ Title }}", title)
-    template_with_content = template_with_title.replace(
-        "{{ Content }}", html_string)
-    template_with_basepath_html = template_with_content.replace(
-        'href="/', f'href="{basepath}')
-    template_with_basepath_src = template_with_basepath_html.replace(
-        'src="/', f'src="{basepath}')
+    chunks = template.iter_render(values, options.basepath, options.asset_map)
+    minifier = HtmlMinifier() if options.minify else None
+    if minifier is not None:
+        chunks = minifier.minify(chunks)
+    written = write_if_changed(destination_path, chunks)
 
-    destination_dir = os.path.dirname(destination_path)
-    if not os.path.exists(destination_dir):
-        os.makedirs(destination_dir)
-    with open(destination_path, "w") as new_file:
-        new_file.write(template_with_basepath_src)
+    if written:
+        print("...Markdown generation completed.")
+    else:
+        print("...output unchanged, left as it was.")
+    return page_record(from_path, destination_path, title, written, notes, minifier)
 
-    print("...Markdown generation completed.")
-    return False
+
+def render_page(from_path, template_path, basepath="/", variables=None, cache_dir=None, asset_map=None, notes=None):
+    markdown = get_file_contents(from_path)
+    template = load_template(template_path)
+    title, content = parse_document(markdown, cache_dir, notes)
+    values = dict(variables or {})
+    values["Title"] = title
+    values["Content"] = content
+    return template.render(values, basepath, asset_map)
+
+
+def generate_page_profiled(from_path, template_path, destination_path, options):
+    # Same output as generate_page, but each stage runs to completion so it
+    # can be timed on its own instead of being interleaved by streaming.
+    print(f"Profiling {from_path} -> {destination_path}")
+    notes = page_notes(options)
+    timer = StageTimer()
+    start = time.perf_counter()
+    with timer.stage("read"):
+        markdown = get_file_contents(from_path)
+        template = load_template(template_path)
+    title, html_string = parse_document(markdown, options.cache_dir, notes, timer)
+    with timer.stage("template"):
+        values = dict(options.variables)
+        values["Title"] = title
+        values["Content"] = html_string
+        page = template.render(values, options.basepath, options.asset_map)
+    minifier = None
+    if options.minify:
+        with timer.stage("minify"):
+            minifier = HtmlMinifier()
+            page = "".join(minifier.minify([page]))
+    with timer.stage("write"):
+        written = write_if_changed(destination_path, [page])
+    record = page_record(from_path, destination_path, title, written, notes, minifier)
+    parsed = timer.stages.get("inline_parse")
+    record.update({
+        "seconds": time.perf_counter() - start,
+        "bytes": len(markdown),
+        "blocks": 0 if parsed is None else parsed[1],
+        "cached": parsed is None,
+        "stages": timer.as_dict(),
+    })
+    return record
 
 
 def get_file_contents(file):
-    file = open(file)
-    return file.read()
+    with open(file) as markdown_file:
+        return markdown_file.read()
 
 
-def generate_pages_recursively(dir_path_content, template_path, dest_dir_path, basepath):
-    for item in os.listdir(dir_path_content):
+def find_pages(dir_path_content, dest_dir_path):
+    pages = []
+    for item in sorted(os.listdir(dir_path_content)):
         item_name = os.path.join(dir_path_content, item)
         destination_name = os.path.join(dest_dir_path, item)
 
         if os.path.isfile(item_name) and item[-3:] == ".md":
-            new_file = destination_name.replace(".md", ".html")
-            generate_page(item_name, template_path, new_file, basepath)
+            pages.append((item_name, destination_name[:-3] + ".html"))
         elif os.path.isdir(item_name):
-            generate_pages_recursively(
-                item_name, template_path, destination_name, basepath)
+            pages.extend(find_pages(item_name, destination_name))
+    return pages
+
+
+def page_destination(from_path, dir_path_content, dest_dir_path):
+    relative_path = os.path.relpath(from_path, dir_path_content)
+    return os.path.join(dest_dir_path, relative_path)[:-3] + ".html"
+
+
+def generate_page_job(job):
+    from_path, template_path, destination_path, options, profile = job
+    return generate_page(from_path, template_path, destination_path, options, profile)
+
+
+def generate_page_logged(job):
+    # a worker's messages come back inside its record, so the parent prints
+    # them whole and in page order, wherever its own stdout points
+    output = io.StringIO()
+    with redirect_stdout(output):
+        record = generate_page_job(job)
+    record["log"] = output.getvalue()
+    return record
+
+
+def map_pages(pool, page_jobs, jobs):
+    # hand each worker several pages per round trip, small pages are cheap
+    # enough that pickling one job at a time would dominate
+    chunksize = max(1, len(page_jobs) // (jobs * 4))
+    records = []
+    for record in pool.map(generate_page_logged, page_jobs, chunksize=chunksize):
+        print(record.pop("log"), end="")
+        records.append(record)
+    return records
+
+
+def generate_pages(pages, options, profile=False, pool=None):
+    # pages are (source, destination, template) triples; a long-running
+    # caller can pass its own pool so the workers and their caches outlive
+    # one build
+    jobs = options.jobs
+    page_jobs = [(from_path, template_path, destination_path, options, profile)
+                 for from_path, destination_path, template_path in pages]
+    if jobs <= 1 or len(page_jobs) < 2:
+        return [generate_page_job(job) for job in page_jobs]
+    if pool is not None:
+        return map_pages(pool, page_jobs, jobs)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return map_pages(pool, page_jobs, jobs)
+
+
+def prune_document_cache(cache_dir, manifest):
+    # only the entries the current pages were rendered from are worth
+    # keeping, along with the notes stored beside them
+    keys = set()
+    for entry in manifest["pages"].values():
+        if entry.get("cache_key") is not None:
+            keys.update((entry["cache_key"], entry["cache_key"] + NOTES_KEY_SUFFIX))
+    removed = DocumentCache(cache_dir).prune(keys)
+    if removed:
+        print(f"Pruned {removed} stale document cache entries.")
+
+
+def generate_pages_recursively(dir_path_content, template_path, dest_dir_path, options, force=False, profile=None, pool=None):
+    basepath = options.basepath
+    index_path = options.index_path
+    if index_path is None:
+        # search terms and references are only kept in the index
+        options = options.replace(search=False, check_links=False)
+    with profile_stage(profile, "scan"):
+        old_manifest = load_manifest(dest_dir_path)
+        assets = asset_map_digest(options.asset_map)
+        rebuild_all = force or not manifest_matches(
+            old_manifest, basepath, options.variables, assets, options.minify)
+        if rebuild_all and old_manifest is not None:
+            print("Basepath, assets or manifest changed, rebuilding every page.")
+
+        manifest = new_manifest(basepath, options.variables, assets, options.minify)
+        directories = {}
+        template_hashes = {}
+        stale_pages = []
+        for from_path, destination_path in find_pages(dir_path_content, dest_dir_path):
+            page_template = select_template(
+                from_path, dir_path_content, template_path, directories)
+            if page_template not in template_hashes:
+                # each template and its partials are hashed once per build
+                template_hashes[page_template] = {
+                    path: hash_file(path)
+                    for path in load_template(page_template).dependencies}
+            hashes = template_hashes[page_template]
+            source_hash = hash_file(from_path)
+            entry = {"hash": source_hash, "output": destination_path,
+                     "template": page_template, "images": {}, "cache_key": None}
+            if not rebuild_all and is_page_current(old_manifest, from_path, source_hash,
+                                                   destination_path, page_template, hashes):
+                print(f"Skipping unchanged {from_path}")
+                old_entry = old_manifest["pages"][from_path]
+                entry["images"] = old_entry.get("images", {})
+                entry["cache_key"] = old_entry.get("cache_key")
+            else:
+                stale_pages.append((from_path, destination_path, page_template))
+            manifest["pages"][from_path] = entry
+            record_template(manifest, from_path, hashes)
+
+    with profile_stage(profile, "render"):
+        records = generate_pages(stale_pages, options, profile is not None, pool)
+    write_stats = WriteStats()
+    minified = [0, 0]
+    for record in records:
+        write_stats.add(record["written"])
+        entry = manifest["pages"][record["source"]]
+        entry["images"] = record["images"]
+        entry["cache_key"] = record.get("cache_key")
+        if "minified" in record:
+            minified[0] += record["minified"][0]
+            minified[1] += record["minified"][1]
+        if profile is not None:
+            profile.add_page(record)
+    if options.minify and records:
+        print(f"Minified {len(records)} pages: {minified[0]} -> {minified[1]} bytes.")
+
+    with profile_stage(profile, "cleanup"):
+        remove_orphaned_outputs(old_manifest, manifest, dest_dir_path)
+        save_manifest(dest_dir_path, manifest)
+        if options.cache_dir is not None:
+            prune_document_cache(options.cache_dir, manifest)
+    if index_path is not None:
+        with profile_stage(profile, "index"):
+            connection = open_index(index_path)
+            try:
+                update_site_index(
+                    connection, manifest["pages"],
+                    {record["source"]: record["title"] for record in records},
+                    dest_dir_path, basepath, options.site_url, extract_title_from_file)
+                if options.search:
+                    update_search_index(
+                        connection, manifest["pages"],
+                        {record["source"]: record["search"] for record in records},
+                        dest_dir_path, basepath, page_search_terms)
+                if options.check_links:
+                    update_link_index(
+                        connection, manifest["pages"],
+                        {record["source"]: record["references"] for record in records},
+                        dest_dir_path, page_references)
+            finally:
+                connection.close()
+    print(f"Generated {len(stale_pages)} of {len(manifest['pages'])} pages "
+          f"({write_stats}).")
+    return write_stats
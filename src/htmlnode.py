@@ -1,6 +1,12 @@
+import hashlib
+
+ENTER = "enter"
+EXIT = "exit"
 
 
 class HtmlNode:
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
@@ -8,8 +14,62 @@ class HtmlNode:
         self.props = props
 
     def to_html(self):
+        return "".join(self.iter_html())
+
+    def html_open(self):
         raise (NotImplementedError)
 
+    def html_close(self):
+        return ""
+
+    def walk(self):
+        # Yields (ENTER, node) before a node's children and (EXIT, node)
+        # after them, using an explicit stack so deep trees can't hit the
+        # recursion limit.
+        stack = [(ENTER, self)]
+        pop = stack.pop
+        push = stack.append
+        while stack:
+            event, node = pop()
+            yield event, node
+            if event is ENTER:
+                children = node.children
+                if children:
+                    push((EXIT, node))
+                    stack.extend([(ENTER, child) for child in reversed(children)])
+                else:
+                    yield EXIT, node
+
+    def preorder(self):
+        for event, node in self.walk():
+            if event is ENTER:
+                yield node
+
+    def postorder(self):
+        for event, node in self.walk():
+            if event is EXIT:
+                yield node
+
+    def iter_html(self):
+        for event, node in self.walk():
+            if event is ENTER:
+                yield node.html_open()
+            elif node.children:
+                yield node.html_close()
+
+    def write_html(self, file, buffer_size=65536):
+        buffer = []
+        buffered = 0
+        for chunk in self.iter_html():
+            buffer.append(chunk)
+            buffered += len(chunk)
+            if buffered >= buffer_size:
+                file.write("".join(buffer))
+                buffer = []
+                buffered = 0
+        if buffer:
+            file.write("".join(buffer))
+
     def props_to_html(self):
         html_string = ""
         if self.props is not None:
@@ -17,38 +77,71 @@ class HtmlNode:
                 html_string += f' {prop}="{self.props[prop]}"'
         return html_string
 
+    def structural_hash(self):
+        # post-order, so every node's hash covers its whole subtree; a
+        # hashlib digest rather than hash(), whose str hashing is seeded per
+        # process, so it can be stored and compared across builds
+        hashes = []
+        for event, node in self.walk():
+            if event is ENTER:
+                continue
+            count = len(node.children)
+            child_hashes = tuple(hashes[len(hashes) - count:]) if count else ()
+            del hashes[len(hashes) - count:]
+            props = tuple(sorted(node.props.items())) if node.props else None
+            fields = repr((node.tag, node.value, props, child_hashes)).encode()
+            hashes.append(hashlib.blake2b(fields, digest_size=16).hexdigest())
+        return hashes[0]
+
     def __eq__(self, other):
         if not isinstance(other, HtmlNode):
             return NotImplemented
 
-        # quick field checks
-        if self.tag != other.tag or self.value != other.value:
-            return False
+        # walk both trees side by side and stop at the first difference
+        stack = [(self, other)]
+        while stack:
+            first, second = stack.pop()
+            if first is second:
+                continue
+            if not (isinstance(first, HtmlNode) and isinstance(second, HtmlNode)):
+                if first != second:
+                    return False
+                continue
+            # quick field checks; dict equality is order-independent by keys
+            if (first.tag != second.tag or first.value != second.value or
+                    first.props != second.props or
+                    len(first.children) != len(second.children)):
+                return False
+            stack.extend(zip(first.children, second.children))
+        return True
 
-        # dict equality is deep & order-independent by keys
-        if self.props != other.props:
-            return False
+    def __repr__(self):
+        # children are rendered before their parent, so each node's repr
+        # pops its children's finished reprs off the results stack
+        results = []
+        for event, node in self.walk():
+            if event is ENTER:
+                continue
+            count = len(node.children)
+            children_reprs = results[len(results) - count:] if count else []
+            del results[len(results) - count:]
+            results.append(node_repr(node, children_reprs))
+        return results[0]
 
-        # list equality is order-sensitive and recurses via each child's __eq__
-        if len(self.children) != len(other.children):
-            return False
 
-        return all(c1 == c2 for c1, c2 in zip(self.children, other.children))
+def node_repr(node, children_reprs):
+    if not children_reprs and not node.props:
+        return f"HtmlNode(tag={node.tag!r}, value={node.value!r}, props={node.props!r})"
 
-    def __repr__(self):
-        if not self.children and not self.props:
-            return f"HtmlNode(tag={self.tag!r}, value={self.value!r}, props={self.props!r})"
-
-        props_repr = ""
-        if self.props:
-            props_repr = ",\n    ".join(
-                f"{k!r}: {v!r}" for k, v in self.props.items())
-            props_repr = f", props={{\n    {props_repr}\n}}"
-
-        children_repr = ""
-        if self.children:
-            children_repr = ",\n    ".join(repr(child)
-                                           for child in self.children)
-            children_repr = f", children=[\n    {children_repr}\n]"
-
-        return f"HtmlNode(tag={self.tag!r}, value={self.value!r}{props_repr}{children_repr})"
+    props_repr = ""
+    if node.props:
+        props_repr = ",\n    ".join(
+            f"{k!r}: {v!r}" for k, v in node.props.items())
+        props_repr = f", props={{\n    {props_repr}\n}}"
+
+    children_repr = ""
+    if children_reprs:
+        children_repr = ",\n    ".join(children_reprs)
+        children_repr = f", children=[\n    {children_repr}\n]"
+
+    return f"HtmlNode(tag={node.tag!r}, value={node.value!r}{props_repr}{children_repr})"
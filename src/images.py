@@ -0,0 +1,122 @@
+import os
+import struct
+
+# path -> ((mtime_ns, size), (width, height) or None); a rewritten file
+# gets a new key, so only its header is read again
+_image_sizes = {}
+
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def png_size(file, header):
+    if header[12:16] != b"IHDR":
+        return None
+    return struct.unpack(">II", header[16:24])
+
+
+def gif_size(file, header):
+    return struct.unpack("<HH", header[6:10])
+
+
+def webp_size(file, header):
+    chunk = header[12:16]
+    if chunk == b"VP8 ":
+        # lossy: the frame header carries 14-bit sizes after the start code
+        if header[23:26] != b"\x9d\x01\x2a":
+            return None
+        width, height = struct.unpack("<HH", header[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        if header[20] != 0x2F:
+            return None
+        bits = int.from_bytes(header[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(header[24:27], "little") + 1
+        height = int.from_bytes(header[27:30], "little") + 1
+        return width, height
+    return None
+
+
+def jpeg_size(file, header):
+    # walk the segments until a start-of-frame one, which holds the size;
+    # a big EXIF block can push it well past the header we already read
+    file.seek(2)
+    while True:
+        byte = file.read(1)
+        while byte and byte != b"\xff":
+            byte = file.read(1)
+        marker = file.read(1)
+        while marker == b"\xff":
+            marker = file.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code == 0x01 or 0xD0 <= code <= 0xD9:
+            # standalone markers carry no length
+            continue
+        length_bytes = file.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if code in JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+            height, width = struct.unpack(">HH", frame[1:5])
+            return width, height
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+def read_image_size(path):
+    with open(path, "rb") as file:
+        header = file.read(32)
+        if len(header) < 10:
+            return None
+        if header.startswith(b"\x89PNG\r\n\x1a\n"):
+            return png_size(file, header)
+        if header[:6] in (b"GIF87a", b"GIF89a"):
+            return gif_size(file, header)
+        if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+            return webp_size(file, header)
+        if header[:2] == b"\xff\xd8":
+            return jpeg_size(file, header)
+    return None
+
+
+def image_size(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = _image_sizes.get(path)
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    try:
+        size = read_image_size(path)
+    except (OSError, struct.error, IndexError):
+        size = None
+    _image_sizes[path] = (key, size)
+    return size
+
+
+def local_image_path(url, image_root):
+    # root-relative URLs map onto a file under image_root, the folder that
+    # gets copied into docs/; anything with a scheme or host lives elsewhere
+    if not url.startswith("/") or url.startswith("//"):
+        return None
+    path = url.split("?", 1)[0].split("#", 1)[0].lstrip("/")
+    if not path:
+        return None
+    return os.path.join(image_root, *path.split("/"))
+
+
+def sizes_current(images):
+    # images is {path: [width, height] or None} as a page recorded them
+    for path, size in images.items():
+        current = image_size(path)
+        if (None if current is None else list(current)) != size:
+            return False
+    return True
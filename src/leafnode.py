@@ -2,17 +2,18 @@ from htmlnode import HtmlNode
 
 
 class LeafNode(HtmlNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
-        children = None
-        super().__init__(tag, value, children, props)
+        self.tag = tag
+        self.value = value
+        # leaves never get children, so they all share one empty tuple
+        self.children = ()
+        self.props = props
 
-    def to_html(self):
-        props_string = ""
+    def html_open(self):
         if self.value is None:
             raise ValueError
         if self.tag is None:
             return self.value
-        if self.props is not None:
-            for prop in self.props:
-                props_string += f' {prop}="{self.props[prop]}"'
-        return f"<{self.tag}{props_string}>{self.value}</{self.tag}>"
+        return f"<{self.tag}{self.props_to_html()}>{self.value}</{self.tag}>"
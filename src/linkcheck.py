@@ -0,0 +1,100 @@
+import os
+import re
+import sys
+import argparse
+import posixpath
+from urllib.parse import unquote
+
+from functions import page_references
+from linkindex import LinkIndex, update_link_index
+from manifest import load_manifest
+from siteindex import DEFAULT_INDEX_PATH, open_index
+
+SCHEME = re.compile(r"^[a-zA-Z][a-zA-Z0-9+.-]*:")
+
+
+def build_target_index(dest_dir_path):
+    # every URL path the built site answers, with a directory's index.html
+    # reachable as "/dir/", "/dir" and "/dir/index.html"
+    targets = set()
+    for root, _, names in os.walk(dest_dir_path):
+        for name in names:
+            url = "/" + os.path.relpath(
+                os.path.join(root, name), dest_dir_path).replace(os.sep, "/")
+            targets.add(url)
+            if name == "index.html":
+                directory = url[:-len("index.html")]
+                targets.add(directory)
+                targets.add(directory.rstrip("/") or "/")
+    return targets
+
+
+def target_path(url, page_path):
+    # the site-relative path a reference points at, or None when it points
+    # off the site (another host, mailto:, a bare #anchor)
+    if SCHEME.match(url) or url.startswith("//"):
+        return None
+    path = unquote(url.split("#", 1)[0].split("?", 1)[0])
+    if not path:
+        return None
+    if not path.startswith("/"):
+        path = posixpath.join(posixpath.dirname(page_path), path)
+    resolved = posixpath.normpath(path)
+    if path.endswith("/") and resolved != "/":
+        resolved += "/"
+    return resolved
+
+
+def check_links(dest_dir_path, basepath="/", index_path=DEFAULT_INDEX_PATH):
+    # References were collected while the pages rendered; all of them are
+    # resolved again on every check, since deleting one page can break
+    # links in pages that didn't change.
+    targets = build_target_index(dest_dir_path)
+    connection = open_index(index_path)
+    try:
+        index = LinkIndex(connection)
+        references = index.references()
+        page_count = index.page_count()
+    finally:
+        connection.close()
+
+    broken = []
+    checked = 0
+    for from_path, page_path, line, kind, url in references:
+        path = target_path(url, page_path)
+        if path is None:
+            continue
+        checked += 1
+        if path not in targets:
+            broken.append((from_path, line, kind, url))
+
+    for from_path, line, kind, url in broken:
+        served = basepath + url[1:] if url.startswith("/") else url
+        print(f"{from_path}:{line}: broken {kind} '{url}' (served as '{served}')")
+    print(f"Checked {checked} internal references in {page_count} pages, "
+          f"{len(broken)} broken.")
+    return broken
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check internal links and images of the site built in docs/.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help="where the page metadata index is kept")
+    args = parser.parse_args()
+    manifest = load_manifest("docs")
+    if manifest is None:
+        sys.exit("No build manifest in 'docs/'; build the site first.")
+    # pages built without --check-links are scanned once here
+    connection = open_index(args.index)
+    try:
+        update_link_index(connection, manifest["pages"], {}, "docs", page_references)
+    finally:
+        connection.close()
+    if check_links("docs", args.basepath, args.index):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
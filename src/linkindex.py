@@ -0,0 +1,57 @@
+from siteindex import page_url
+
+
+class LinkIndex:
+    # every link and image reference, by the page it's written in, so a
+    # check only has to resolve them against the built site again
+    def __init__(self, connection):
+        self.connection = connection
+
+    def hashes(self):
+        return dict(self.connection.execute("SELECT source, hash FROM link_pages"))
+
+    def replace(self, source, page_path, source_hash, references):
+        self.connection.execute("DELETE FROM links WHERE source = ?", (source,))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO link_pages VALUES (?, ?, ?)",
+            (source, page_path, source_hash))
+        self.connection.executemany(
+            "INSERT INTO links VALUES (?, ?, ?, ?)",
+            [(source, line, kind, url) for line, kind, url in references])
+
+    def remove(self, source):
+        self.connection.execute("DELETE FROM links WHERE source = ?", (source,))
+        self.connection.execute("DELETE FROM link_pages WHERE source = ?", (source,))
+
+    def page_count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM link_pages").fetchone()[0]
+
+    def references(self):
+        # (source, page path, line, kind, url) in the order they were written
+        return self.connection.execute(
+            "SELECT links.source, link_pages.path, line, kind, url FROM links "
+            "JOIN link_pages ON links.source = link_pages.source "
+            "ORDER BY links.source, links.rowid").fetchall()
+
+
+def update_link_index(connection, pages, references, dest_dir_path, read_references):
+    # references holds what the pages rendered this run collected; any
+    # other page whose hash the index doesn't know yet is scanned again
+    # with read_references
+    index = LinkIndex(connection)
+    known = index.hashes()
+    updated = 0
+    with index.connection:
+        for source, entry in pages.items():
+            if source not in references and known.get(source) == entry["hash"]:
+                continue
+            page_references = references.get(source)
+            if page_references is None:
+                page_references = read_references(source)
+            page_path = "/" + page_url(entry["output"], dest_dir_path)
+            index.replace(source, page_path, entry["hash"], page_references)
+            updated += 1
+        for source in set(known) - set(pages):
+            index.remove(source)
+            updated += 1
+    return updated
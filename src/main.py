@@ -1,12 +1,147 @@
+import os
 import sys
-from filefunctions import copy_static_to_public
-from functions import generate_pages_recursively
+import argparse
+from filefunctions import delete_public_dir, sync_static_to_public
+from assets import fingerprint_static
+from compress import compress_output, DEFAULT_MIN_SIZE
+from functions import generate_pages_recursively, generate_page
+from buildoptions import BuildOptions
+from profiler import BuildProfile, profile_stage
+from watcher import SiteWatcher
+from doccache import DEFAULT_CACHE_DIR
+from siteindex import DEFAULT_INDEX_PATH
+from linkcheck import check_links
+from template import select_template
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Build the site from content/ into docs/.")
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument("--clean", action="store_true",
+                        help="delete docs/ and rebuild everything")
+    parser.add_argument("--checksum", action="store_true",
+                        help="compare static assets by hash, not mtime")
+    parser.add_argument("--fingerprint", action="store_true",
+                        help="link assets under names that carry their hash")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="render pages in N processes (0 = one per CPU)")
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE",
+                        help="fill {{ NAME }} in the template with VALUE")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR,
+                        help="where parsed documents are cached")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="parse every page without the document cache")
+    parser.add_argument("--stream-threshold", type=int, default=32 * 1024 * 1024,
+                        metavar="BYTES",
+                        help="stream pages at least this large block by block "
+                             "(-1 to never stream)")
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH,
+                        help="where the page metadata index is kept")
+    parser.add_argument("--site-url", metavar="URL",
+                        help="write sitemap.xml and blog/feed.xml for a site "
+                             "served from URL, e.g. https://example.com")
+    parser.add_argument("--search", action="store_true",
+                        help="write a sharded search index to docs/search/")
+    parser.add_argument("--minify", action="store_true",
+                        help="strip needless whitespace from pages and CSS")
+    parser.add_argument("--compress", action="store_true",
+                        help="write .gz (and .br/.zst when available) siblings "
+                             "next to text files in docs/")
+    parser.add_argument("--compress-min-size", type=int, default=DEFAULT_MIN_SIZE,
+                        metavar="BYTES",
+                        help="leave files smaller than this uncompressed")
+    parser.add_argument("--check-links", action="store_true",
+                        help="report internal links and images that don't "
+                             "resolve, and fail the build if any are found")
+    parser.add_argument("--profile", action="store_true",
+                        help="time each build stage and page")
+    parser.add_argument("--profile-output", default="build-profile.json",
+                        help="where --profile writes its JSON report")
+    parser.add_argument("--profile-top", type=int, default=0, metavar="N",
+                        help="attach cProfile output for the N slowest pages")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and rebuild what changes")
+    parser.add_argument("--interval", type=float, default=0.25,
+                        help="seconds between --watch scans")
+    return parser.parse_args(argv)
+
+
+def parse_variables(assignments):
+    variables = {}
+    for assignment in assignments:
+        name, separator, value = assignment.partition("=")
+        if not separator or not name:
+            raise SystemExit(f"--var expects NAME=VALUE, got '{assignment}'")
+        variables[name] = value
+    return variables
+
+
+def build_options(args):
+    # the settings both a one-off build and --watch render with
+    return BuildOptions(
+        args.basepath, parse_variables(args.var), args.jobs or os.cpu_count() or 1,
+        cache_dir=None if args.no_cache else args.cache_dir,
+        stream_threshold=None if args.stream_threshold < 0 else args.stream_threshold,
+        minify=args.minify, static_dir="static", index_path=args.index,
+        site_url=args.site_url, search=args.search, check_links=args.check_links,
+        fingerprint=args.fingerprint, compress=args.compress,
+        compress_min_size=args.compress_min_size)
+
+
+def build(args, pool=None):
+    # one full build; returns the broken links --check-links found. pool,
+    # when given, renders the pages instead of a pool started for this build
+    profile = BuildProfile() if args.profile else None
+    with profile_stage(profile, "static"):
+        if args.clean:
+            delete_public_dir()
+        sync_static_to_public(checksum=args.checksum, minify=args.minify)
+    options = build_options(args)
+    if options.fingerprint:
+        with profile_stage(profile, "assets"):
+            options.asset_map = fingerprint_static("static", "docs", options.jobs)
+    generate_pages_recursively(
+        "content", "template.html", "docs", options, profile=profile, pool=pool)
+
+    if options.compress:
+        with profile_stage(profile, "compress"):
+            compress_output("docs", options.jobs, options.compress_min_size)
+
+    broken = []
+    if options.check_links:
+        with profile_stage(profile, "check_links"):
+            broken = check_links("docs", options.basepath, options.index_path)
+
+    if profile is not None:
+        if args.profile_top:
+            # parsed from scratch, a document cache hit would hide the work
+            # being profiled; terms and references aren't needed again
+            page_options = options.replace(cache_dir=None, search=False,
+                                           check_links=False)
+            profile.attach_cprofile(
+                lambda page: generate_page(page["source"],
+                                           select_template(page["source"], "content",
+                                                           "template.html"),
+                                           page["output"], page_options),
+                args.profile_top)
+        profile.write(args.profile_output)
+    return broken
 
 
 def main():
-    basepath = sys.argv[1] if len(sys.argv) > 1 else "/"
-    copy_static_to_public()
-    generate_pages_recursively("content", "template.html", "docs", basepath)
+    if sys.argv[1:2] == ["serve-builds"]:
+        from buildserver import serve_builds
+        serve_builds(sys.argv[2:])
+        return
+    args = parse_args()
+    broken = build(args)
+    if args.watch:
+        watcher = SiteWatcher("content", "template.html", "docs", build_options(args))
+        watcher.run(args.interval)
+    elif broken:
+        raise SystemExit(1)
 
 
-main()
+if __name__ == "__main__":
+    main()
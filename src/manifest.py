@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+
+from images import sizes_current
+
+MANIFEST_NAME = ".manifest.json"
+MANIFEST_VERSION = 4
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def new_manifest(basepath, variables=None, assets=None, minify=False):
+    # "templates" holds the hash of every template and partial in use, and
+    # "graph" maps each of those files to the pages rendered with it
+    return {
+        "version": MANIFEST_VERSION,
+        "templates": {},
+        "graph": {},
+        "basepath": basepath,
+        "variables": variables or {},
+        "assets": assets,
+        "minify": minify,
+        "pages": {},
+    }
+
+
+def read_json(path):
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        print(f"Ignoring unreadable manifest '{path}'.")
+        return None
+
+
+def write_json(path, data):
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(data, file, indent=1, sort_keys=True)
+    os.replace(temp_path, path)
+
+
+def load_manifest(dest_dir_path):
+    manifest = read_json(os.path.join(dest_dir_path, MANIFEST_NAME))
+    if manifest is None or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(dest_dir_path, manifest):
+    write_json(os.path.join(dest_dir_path, MANIFEST_NAME), manifest)
+
+
+def manifest_matches(manifest, basepath, variables=None, assets=None, minify=False):
+    # a basepath, variable, asset URL or minify change touches every page,
+    # so the old per-page entries can't be trusted
+    return (
+        manifest is not None and
+        manifest["basepath"] == basepath and
+        manifest.get("variables", {}) == (variables or {}) and
+        manifest.get("assets") == assets and
+        manifest.get("minify", False) == minify
+    )
+
+
+def is_page_current(manifest, from_path, source_hash, destination_path,
+                    template_path=None, template_hashes=None):
+    entry = manifest["pages"].get(from_path)
+    if entry is None:
+        return False
+    # the page is only as current as the template and partials it used
+    for path, template_hash in (template_hashes or {}).items():
+        if manifest["templates"].get(path) != template_hash:
+            return False
+    # and the images whose width and height it carries
+    return (
+        entry["hash"] == source_hash and
+        entry["output"] == destination_path and
+        entry.get("template") == template_path and
+        os.path.exists(destination_path) and
+        sizes_current(entry.get("images", {}))
+    )
+
+
+def record_template(manifest, from_path, template_hashes):
+    for path, template_hash in template_hashes.items():
+        manifest["templates"][path] = template_hash
+        pages = manifest["graph"].setdefault(path, [])
+        if from_path not in pages:
+            pages.append(from_path)
+
+
+def dependent_pages(manifest, path):
+    return manifest["graph"].get(path, [])
+
+
+def remove_orphaned_outputs(old_manifest, manifest, dest_dir_path):
+    if old_manifest is None:
+        return []
+    current_outputs = {entry["output"] for entry in manifest["pages"].values()}
+    removed = []
+    for from_path, entry in old_manifest["pages"].items():
+        output = entry["output"]
+        if output in current_outputs or not os.path.exists(output):
+            continue
+        print(f"Removing '{output}', its source '{from_path}' is gone.")
+        os.remove(output)
+        remove_empty_dirs(os.path.dirname(output), dest_dir_path)
+        removed.append(output)
+    return removed
+
+
+def remove_empty_dirs(directory, stop_dir):
+    stop_dir = os.path.abspath(stop_dir)
+    directory = os.path.abspath(directory)
+    while directory != stop_dir and directory.startswith(stop_dir + os.sep):
+        if os.listdir(directory):
+            break
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
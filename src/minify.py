@@ -0,0 +1,127 @@
+import re
+
+# element contents that are shown (or run) exactly as written
+PRESERVE_TAGS = ("pre", "code", "textarea", "script", "style")
+PRESERVE_START = re.compile(rf"<({'|'.join(PRESERVE_TAGS)})[\s>]", re.IGNORECASE)
+# searched from the current position, so a page full of <code> spans is
+# never lowercased or rescanned as a whole
+PRESERVE_END = {tag: re.compile(rf"</{tag}>", re.IGNORECASE) for tag in PRESERVE_TAGS}
+WHITESPACE = re.compile(r"\s+")
+CSS_TOKEN = re.compile(
+    r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?(?:\*/|$)|\s+|[{};,>:]|'
+    r'[^"\'/\s{};,>:]+|/', re.DOTALL)
+CSS_TIGHT = set("{};,>")
+
+
+class HtmlMinifier:
+    # Chunks go in, minified chunks come out. Whitespace runs collapse to a
+    # single space, and disappear entirely when they sit on their own line
+    # between two tags. Anything that could continue in the next chunk (a
+    # whitespace run, a half-written tag, the end of a <pre>) is held back.
+    def __init__(self):
+        self.pending = ""
+        self.closing = None
+        self.last = ""
+        self.size_in = 0
+        self.size_out = 0
+
+    def collapse(self, segment, following):
+        def replace(match):
+            run = match.group()
+            before = segment[match.start() - 1] if match.start() else self.last
+            after = segment[match.end()] if match.end() < len(segment) else following
+            if before in ("", ">") and after in ("", "<"):
+                if "\n" in run or not before or not after:
+                    return ""
+            return " "
+        return WHITESPACE.sub(replace, segment)
+
+    def holdback(self, text, position):
+        end = len(text)
+        tag_start = text.rfind("<", position)
+        if tag_start != -1 and text.find(">", tag_start) == -1:
+            end = tag_start
+        while end > position and text[end - 1].isspace():
+            end -= 1
+        return end
+
+    def emit(self, pieces, piece):
+        if piece:
+            pieces.append(piece)
+            self.last = piece[-1]
+
+    def process(self, text, final=False):
+        pieces = []
+        position = 0
+        while position < len(text):
+            if self.closing is not None:
+                match = self.closing.search(text, position)
+                if match is None:
+                    keep = len(text) if final else max(
+                        position, len(text) - len(self.closing.pattern) + 1)
+                    self.emit(pieces, text[position:keep])
+                    position = keep
+                    break
+                end = match.end()
+                self.emit(pieces, text[position:end])
+                position = end
+                self.closing = None
+                continue
+            match = PRESERVE_START.search(text, position)
+            if match is None:
+                end = len(text) if final else self.holdback(text, position)
+                following = "" if final else text[end:end + 1]
+                self.emit(pieces, self.collapse(text[position:end], following))
+                position = end
+                break
+            self.emit(pieces, self.collapse(text[position:match.start()], "<"))
+            self.closing = PRESERVE_END[match.group(1).lower()]
+            position = match.start()
+        self.pending = text[position:]
+        output = "".join(pieces)
+        self.size_out += len(output.encode())
+        return output
+
+    def feed(self, chunk):
+        self.size_in += len(chunk.encode())
+        return self.process(self.pending + chunk)
+
+    def finish(self):
+        return self.process(self.pending, final=True)
+
+    def minify(self, chunks):
+        for chunk in chunks:
+            output = self.feed(chunk)
+            if output:
+                yield output
+        output = self.finish()
+        if output:
+            yield output
+
+
+def minify_html(text):
+    minifier = HtmlMinifier()
+    return "".join(minifier.minify([text]))
+
+
+def minify_css(text):
+    # drops comments and every space the grammar doesn't need; strings are
+    # copied as they are, and a space before ":" is kept since "a :hover"
+    # and "a:hover" select different things
+    output = []
+    space = False
+    for token in CSS_TOKEN.findall(text):
+        if token.startswith("/*") or token.isspace():
+            space = True
+            continue
+        if token in CSS_TIGHT:
+            if token == "}" and output and output[-1] == ";":
+                output.pop()
+            output.append(token)
+            space = False
+            continue
+        if space and output and output[-1] not in CSS_TIGHT and output[-1] != ":":
+            output.append(" ")
+        output.append(token)
+        space = False
+    return "".join(output)
@@ -0,0 +1,98 @@
+import json
+from collections import Counter
+
+from images import image_size, local_image_path
+from search import tokenize
+from textnode import TextType
+
+# the notes for a cached document sit next to it in the document cache
+NOTES_KEY_SUFFIX = "-notes"
+
+
+class PageNotes:
+    # What rendering a page finds out besides its HTML. The width and height
+    # of every local image end up in the page, so each one is kept as
+    # {path: [width, height] or None} for the manifest to check next build.
+    # With search on, every TextNode the renderer converts is tokenized as
+    # it goes by, so the index never parses the page a second time; with
+    # references on, every link and image is kept as (line, kind, url).
+    def __init__(self, image_root=None, search=False, references=False):
+        self.image_root = image_root
+        self.images = {}
+        self.terms = Counter() if search else None
+        self.references = [] if references else None
+        # the document cache entry the page was rendered from or into, which
+        # the manifest keeps so the build can prune every other entry
+        self.cache_key = None
+        self.block_start = 0
+        self.block_lines = []
+        self.offset = 0
+
+    def image_size(self, url):
+        if self.image_root is None:
+            return None
+        path = local_image_path(url, self.image_root)
+        if path is None:
+            return None
+        size = image_size(path)
+        self.images[path] = None if size is None else list(size)
+        return size
+
+    def wants_lines(self):
+        return self.references is not None
+
+    def start_block(self, line, block):
+        self.block_start = line
+        self.block_lines = block.split("\n")
+        self.offset = 0
+
+    def add(self, text_node):
+        if self.terms is not None:
+            self.terms.update(tokenize(text_node.text))
+        if self.references is not None and text_node.text_type in (
+                TextType.LINK, TextType.IMAGE):
+            self.add_reference(text_node)
+
+    def add_reference(self, text_node):
+        # point at the line the reference is written on, not just the start
+        # of its block
+        target = f"({text_node.url})"
+        for index in range(self.offset, len(self.block_lines)):
+            if target in self.block_lines[index]:
+                self.offset = index
+                break
+        kind = "image" if text_node.text_type == TextType.IMAGE else "link"
+        self.references.append((self.block_start + self.offset, kind, text_node.url))
+
+    def collected(self):
+        notes = {}
+        if self.terms is not None:
+            notes["terms"] = dict(self.terms)
+        if self.references is not None:
+            notes["references"] = self.references
+        return notes
+
+    def load_cached(self, cache, key):
+        # a cache hit skips the render, so what it would have collected
+        # comes from the cache too; False sends the page to the renderer
+        self.cache_key = key
+        wanted = self.collected()
+        if not wanted:
+            return True
+        entry = cache.get(key + NOTES_KEY_SUFFIX)
+        if entry is None:
+            return False
+        notes = json.loads(entry[1])
+        if not set(wanted) <= set(notes):
+            return False
+        if self.terms is not None:
+            self.terms = Counter(notes["terms"])
+        if self.references is not None:
+            self.references = [tuple(reference) for reference in notes["references"]]
+        return True
+
+    def save_cached(self, cache, key):
+        self.cache_key = key
+        notes = self.collected()
+        if notes:
+            cache.put(key + NOTES_KEY_SUFFIX, "", json.dumps(notes))
@@ -0,0 +1,90 @@
+import io
+import json
+import time
+import cProfile
+import pstats
+from contextlib import contextmanager, nullcontext
+
+
+class StageTimer:
+    def __init__(self):
+        self.stages = {}
+
+    def add(self, name, seconds, calls=1):
+        total, count = self.stages.get(name, (0.0, 0))
+        self.stages[name] = (total + seconds, count + calls)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def as_dict(self):
+        return {name: {"seconds": seconds, "calls": calls}
+                for name, (seconds, calls) in self.stages.items()}
+
+
+# what a page record contributes to the report; its search terms,
+# references and the like would only bloat it
+PAGE_FIELDS = ("source", "output", "seconds", "bytes", "blocks", "cached", "stages")
+
+
+class BuildProfile:
+    def __init__(self):
+        self.timer = StageTimer()
+        self.page_stages = StageTimer()
+        self.pages = []
+        self.cprofiles = {}
+        self.started = time.perf_counter()
+
+    def stage(self, name):
+        return self.timer.stage(name)
+
+    def add_page(self, record):
+        self.pages.append({field: record[field] for field in PAGE_FIELDS
+                           if field in record})
+        for name, stage in record["stages"].items():
+            self.page_stages.add(name, stage["seconds"], stage["calls"])
+
+    def slowest_pages(self, count):
+        return sorted(self.pages, key=lambda page: page["seconds"],
+                      reverse=True)[:count]
+
+    def attach_cprofile(self, render_page, count, lines=30):
+        # re-render the slowest pages under cProfile rather than profiling
+        # every page, the pool workers can't hand a Profile object back
+        for page in self.slowest_pages(count):
+            profiler = cProfile.Profile()
+            profiler.runcall(render_page, page)
+            output = io.StringIO()
+            stats = pstats.Stats(profiler, stream=output)
+            stats.sort_stats("cumulative").print_stats(lines)
+            self.cprofiles[page["source"]] = output.getvalue()
+
+    def report(self, slowest=10):
+        return {
+            "wall_seconds": time.perf_counter() - self.started,
+            "build_stages": self.timer.as_dict(),
+            "page_stages": self.page_stages.as_dict(),
+            "page_count": len(self.pages),
+            "slowest_pages": [
+                dict(page, cprofile=self.cprofiles[page["source"]])
+                if page["source"] in self.cprofiles else page
+                for page in self.slowest_pages(slowest)
+            ],
+            "pages": self.pages,
+        }
+
+    def write(self, path, slowest=10):
+        with open(path, "w") as file:
+            json.dump(self.report(slowest), file, indent=1)
+        print(f"Wrote build profile to '{path}'.")
+
+
+def profile_stage(profile, name):
+    if profile is None:
+        return nullcontext()
+    return profile.stage(name)
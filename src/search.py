@@ -0,0 +1,140 @@
+import os
+import re
+import json
+from collections import Counter
+
+from siteindex import page_url
+from writer import write_if_changed
+
+# Written under docs/search/: docs.json maps a document id to [url, title],
+# and <prefix>.json holds {term: [[id, count], ...]} for every term starting
+# with that prefix, so a query only fetches the shards of its own words.
+SEARCH_DIR = "search"
+DOCS_NAME = "docs.json"
+SHARD_PREFIX_LENGTH = 2
+TITLE_WEIGHT = 5
+WORD = re.compile(r"[^\W_]+")
+
+
+def tokenize(text):
+    return [word for word in WORD.findall(text.lower()) if len(word) > 1]
+
+
+def weigh_title(title, counts):
+    counts = Counter(counts)
+    for word in tokenize(title):
+        counts[word] += TITLE_WEIGHT
+    return dict(counts)
+
+
+def shard_name(term):
+    return term[:SHARD_PREFIX_LENGTH]
+
+
+def dump_json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), sort_keys=True)
+
+
+class SearchIndex:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def hashes(self):
+        return dict(self.connection.execute("SELECT source, hash FROM search_docs"))
+
+    def doc_id(self, source):
+        row = self.connection.execute(
+            "SELECT id FROM search_docs WHERE source = ?", (source,)).fetchone()
+        return None if row is None else row[0]
+
+    def drop_postings(self, doc):
+        shards = {row[0] for row in self.connection.execute(
+            "SELECT DISTINCT shard FROM postings WHERE doc = ?", (doc,))}
+        self.connection.execute("DELETE FROM postings WHERE doc = ?", (doc,))
+        return shards
+
+    def replace(self, source, url, title, source_hash, terms):
+        # returns the shards whose contents may have changed
+        doc = self.doc_id(source)
+        shards = set()
+        if doc is None:
+            doc = self.connection.execute(
+                "INSERT INTO search_docs (source, url, title, hash) VALUES (?, ?, ?, ?)",
+                (source, url, title, source_hash)).lastrowid
+        else:
+            shards = self.drop_postings(doc)
+            self.connection.execute(
+                "UPDATE search_docs SET url = ?, title = ?, hash = ? WHERE id = ?",
+                (url, title, source_hash, doc))
+        self.connection.executemany(
+            "INSERT INTO postings VALUES (?, ?, ?, ?)",
+            [(term, shard_name(term), doc, count) for term, count in terms.items()])
+        return shards | {shard_name(term) for term in terms}
+
+    def remove(self, source):
+        doc = self.doc_id(source)
+        if doc is None:
+            return set()
+        self.connection.execute("DELETE FROM search_docs WHERE id = ?", (doc,))
+        return self.drop_postings(doc)
+
+    def shard(self, name):
+        terms = {}
+        for term, doc, count in self.connection.execute(
+                "SELECT term, doc, count FROM postings WHERE shard = ? "
+                "ORDER BY term, count DESC, doc", (name,)):
+            terms.setdefault(term, []).append([doc, count])
+        return terms
+
+    def shards(self):
+        return {row[0] for row in self.connection.execute(
+            "SELECT DISTINCT shard FROM postings")}
+
+    def documents(self):
+        return {str(doc): [url, title] for doc, url, title in self.connection.execute(
+            "SELECT id, url, title FROM search_docs ORDER BY id")}
+
+
+def write_shard(index, search_dir, name):
+    path = os.path.join(search_dir, f"{name}.json")
+    terms = index.shard(name)
+    if not terms:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    write_if_changed(path, [dump_json(terms)])
+
+
+def update_search_index(connection, pages, terms, dest_dir_path, basepath, read_terms):
+    # terms holds (title, {term: count}) for the pages rendered this run;
+    # any other page whose hash the index doesn't know yet is read again
+    # with read_terms. Only the shards those pages touch are rewritten.
+    index = SearchIndex(connection)
+    known = index.hashes()
+    touched = set()
+    indexed = 0
+    with index.connection:
+        for source, entry in pages.items():
+            if source not in terms and known.get(source) == entry["hash"]:
+                continue
+            title, page_counts = terms.get(source) or read_terms(source)
+            url = basepath + page_url(entry["output"], dest_dir_path)
+            touched |= index.replace(source, url, title, entry["hash"], page_counts)
+            indexed += 1
+        for source in set(known) - set(pages):
+            touched |= index.remove(source)
+            indexed += 1
+
+    search_dir = os.path.join(dest_dir_path, SEARCH_DIR)
+    docs_path = os.path.join(search_dir, DOCS_NAME)
+    missing = not os.path.exists(docs_path)
+    if missing:
+        # the output was wiped, so every shard has to come back
+        touched |= index.shards()
+    if indexed or missing:
+        for name in sorted(touched):
+            write_shard(index, search_dir, name)
+        write_if_changed(docs_path, [dump_json(index.documents())])
+        print(f"Search index: {indexed} pages indexed, "
+              f"{len(touched)} shards updated.")
+    return indexed
@@ -0,0 +1,222 @@
+import os
+import hashlib
+import argparse
+import mimetypes
+import threading
+import posixpath
+from collections import OrderedDict
+from urllib.parse import urlsplit, unquote
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from functions import render_page
+from main import parse_variables
+from pagenotes import PageNotes
+from template import file_key, load_template, select_template
+
+
+def optional_file_key(path):
+    try:
+        return file_key(path)
+    except OSError:
+        return None
+
+
+class PageCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, validator):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] != validator:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, validator, value):
+        with self.lock:
+            self.entries[key] = (validator, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+
+def clean_url_path(url, basepath="/"):
+    # normalising from the root folds any ".." away, so the parts can
+    # never point outside content/ or static/. Pages link to each other
+    # under the basepath, which is dropped; None for urls outside it.
+    path = posixpath.normpath("/" + unquote(urlsplit(url).path))
+    # normpath keeps a leading "//", which the prefix check must not see
+    path = "/" + path.lstrip("/")
+    prefix = "/" + basepath.strip("/")
+    if prefix != "/":
+        if path != prefix and not path.startswith(prefix + "/"):
+            return None
+        path = path[len(prefix):]
+    return [part for part in path.split("/") if part]
+
+
+def find_source(content_dir, parts):
+    # /blog/tom, /blog/tom/ and /blog/tom/index.html all come from
+    # content/blog/tom/index.md; /about.html can also be content/about.md
+    if parts and parts[-1].endswith(".html"):
+        stem = parts[-1][:-5]
+        parts = parts[:-1] if stem == "index" else parts[:-1] + [stem]
+    directory = os.path.join(content_dir, *parts)
+    candidates = [os.path.join(directory, "index.md")]
+    if parts:
+        candidates.append(directory + ".md")
+    for candidate in candidates:
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+class PreviewSite:
+    def __init__(self, content_dir="content", template_path="template.html",
+                 static_dir="static", basepath="/", variables=None, cache_size=256):
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.static_dir = static_dir
+        self.basepath = basepath
+        self.variables = variables or {}
+        self.cache = PageCache(cache_size)
+        # source -> the images its last render took a width and height from
+        self.page_images = {}
+
+    def page(self, source):
+        template_path = select_template(source, self.content_dir, self.template_path)
+        # load_template is cheap once compiled and tells us every partial,
+        # so an edited partial invalidates the pages that include it
+        validator = (file_key(source), template_path, tuple(
+            file_key(path) for path in load_template(template_path).dependencies),
+            self.images_key(source))
+        cached = self.cache.get(source, validator)
+        if cached is not None:
+            return cached
+        notes = PageNotes(self.static_dir)
+        body = render_page(source, template_path, self.basepath, self.variables,
+                           notes=notes).encode()
+        self.page_images[source] = sorted(notes.images)
+        validator = validator[:3] + (self.images_key(source),)
+        etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        page = (body, etag, "text/html; charset=utf-8")
+        self.cache.put(source, validator, page)
+        return page
+
+    def images_key(self, source):
+        return tuple((path, optional_file_key(path))
+                     for path in self.page_images.get(source, ()))
+
+    def asset(self, parts):
+        path = os.path.join(self.static_dir, *parts)
+        if not parts or not os.path.isfile(path):
+            return None
+        mtime_ns, size = file_key(path)
+        etag = f'"{mtime_ns:x}-{size:x}"'
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        return path, etag, content_type
+
+    def resolve(self, url):
+        # returns (status, body, etag, content type); the body is the
+        # rendered bytes for a page and the file path for a static asset
+        parts = clean_url_path(url, self.basepath)
+        if parts is None:
+            return 404, None, None, None
+        source = find_source(self.content_dir, parts)
+        if source is not None:
+            body, etag, content_type = self.page(source)
+            return 200, body, etag, content_type
+        asset = self.asset(parts)
+        if asset is not None:
+            path, etag, content_type = asset
+            return 200, path, etag, content_type
+        return 404, None, None, None
+
+
+def etag_matches(header, etag):
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    site = None
+
+    def do_GET(self):
+        self.respond(send_body=True)
+
+    def do_HEAD(self):
+        self.respond(send_body=False)
+
+    def respond(self, send_body):
+        try:
+            status, body, etag, content_type = self.site.resolve(self.path)
+        except Exception as error:
+            message = f"Failed to render {self.path}: {error}".encode()
+            self.send_response(500)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("Content-Length", str(len(message)))
+            self.end_headers()
+            if send_body:
+                self.wfile.write(message)
+            return
+        if status == 404:
+            self.send_error(404)
+            return
+        if etag_matches(self.headers.get("If-None-Match"), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        if isinstance(body, str):
+            with open(body, "rb") as file:
+                body = file.read()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        if send_body:
+            self.wfile.write(body)
+
+
+def make_server(site, host="127.0.0.1", port=8888):
+    handler = type("SiteHandler", (PreviewHandler,), {"site": site})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Preview the site, rendering pages straight from content/.")
+    parser.add_argument("port", nargs="?", type=int, default=8888)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--basepath", default="/")
+    parser.add_argument("--var", action="append", default=[], metavar="NAME=VALUE",
+                        help="fill {{ NAME }} in the template with VALUE")
+    return parser.parse_args(argv)
+
+
+def main():
+    args = parse_args()
+    site = PreviewSite(basepath=args.basepath, variables=parse_variables(args.var))
+    server = make_server(site, args.host, args.port)
+    print(f"Serving preview on http://{args.host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Stopped preview server.")
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+
+from writer import write_if_changed
+
+DEFAULT_INDEX_PATH = os.path.join(".cache", "site-index.sqlite")
+INDEX_VERSION = 2
+# the site index, the search index and the link index share one database;
+# a version change drops every one of these tables, not just those of the
+# part of the build that happened to open it first
+INDEX_TABLES = ("pages", "search_docs", "postings", "link_pages", "links")
+INDEX_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS pages ("
+    "source TEXT PRIMARY KEY, output TEXT, url TEXT, title TEXT, "
+    "hash TEXT, mtime_ns INTEGER)",
+    "CREATE TABLE IF NOT EXISTS search_docs ("
+    "id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT UNIQUE, "
+    "url TEXT, title TEXT, hash TEXT)",
+    "CREATE TABLE IF NOT EXISTS postings ("
+    "term TEXT, shard TEXT, doc INTEGER, count INTEGER)",
+    "CREATE INDEX IF NOT EXISTS postings_shard ON postings (shard)",
+    "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc)",
+    "CREATE TABLE IF NOT EXISTS link_pages ("
+    "source TEXT PRIMARY KEY, path TEXT, hash TEXT)",
+    "CREATE TABLE IF NOT EXISTS links ("
+    "source TEXT, line INTEGER, kind TEXT, url TEXT)",
+    "CREATE INDEX IF NOT EXISTS links_source ON links (source)",
+)
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+# every page under one of these gets listed in <section>/feed.xml
+FEED_SECTIONS = ("blog",)
+FEED_LENGTH = 20
+
+
+def page_url(output, dest_dir_path):
+    # docs/blog/tom/index.html -> blog/tom/, docs/contact.html -> contact.html
+    url = os.path.relpath(output, dest_dir_path).replace(os.sep, "/")
+    if url == "index.html":
+        return ""
+    if url.endswith("/index.html"):
+        return url[:-len("index.html")]
+    return url
+
+
+def open_index(path=DEFAULT_INDEX_PATH):
+    # one connection for a build's site, search and link index updates
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or row[0] != str(INDEX_VERSION):
+            for table in INDEX_TABLES:
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+            connection.execute("DELETE FROM meta")
+            connection.execute("INSERT INTO meta VALUES ('version', ?)",
+                               (str(INDEX_VERSION),))
+        for statement in INDEX_SCHEMA:
+            connection.execute(statement)
+    return connection
+
+
+class SiteIndex:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def get_meta(self, key):
+        row = self.connection.execute(
+            "SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key, value):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def hashes(self):
+        return dict(self.connection.execute("SELECT source, hash FROM pages"))
+
+    def put(self, source, output, url, title, source_hash, mtime_ns):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)",
+            (source, output, url, title, source_hash, mtime_ns))
+
+    def remove(self, source):
+        self.connection.execute("DELETE FROM pages WHERE source = ?", (source,))
+
+    def pages(self):
+        return self.connection.execute(
+            "SELECT url, title, mtime_ns FROM pages ORDER BY url").fetchall()
+
+    def section_pages(self, section, limit):
+        return self.connection.execute(
+            "SELECT url, title, mtime_ns FROM pages "
+            "WHERE url LIKE ? AND url != ? ORDER BY mtime_ns DESC, url LIMIT ?",
+            (f"{section}/%", f"{section}/", limit)).fetchall()
+
+
+def absolute_url(origin, basepath, url):
+    return f"{origin.rstrip('/')}{basepath}{url}"
+
+
+def mtime_datetime(mtime_ns):
+    return datetime.fromtimestamp(mtime_ns / 1e9, timezone.utc)
+
+
+def iter_sitemap(index, origin, basepath):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    for url, _, mtime_ns in index.pages():
+        location = escape(absolute_url(origin, basepath, url))
+        modified = mtime_datetime(mtime_ns).date().isoformat()
+        yield f"<url><loc>{location}</loc><lastmod>{modified}</lastmod></url>\n"
+    yield "</urlset>\n"
+
+
+def iter_feed(index, section, origin, basepath, site_title):
+    link = escape(absolute_url(origin, basepath, f"{section}/"))
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<rss version="2.0"><channel>\n'
+    yield f"<title>{escape(site_title)}</title><link>{link}</link>"
+    yield f"<description>{escape(site_title)}</description>\n"
+    for url, title, mtime_ns in index.section_pages(section, FEED_LENGTH):
+        location = escape(absolute_url(origin, basepath, url))
+        published = format_datetime(mtime_datetime(mtime_ns), usegmt=True)
+        yield (f"<item><title>{escape(title)}</title><link>{location}</link>"
+               f"<guid>{location}</guid><pubDate>{published}</pubDate></item>\n")
+    yield "</channel></rss>\n"
+
+
+def write_site_files(index, dest_dir_path, origin, basepath, site_title):
+    write_if_changed(os.path.join(dest_dir_path, SITEMAP_NAME),
+                     iter_sitemap(index, origin, basepath))
+    for section in FEED_SECTIONS:
+        if not index.section_pages(section, 1):
+            continue
+        write_if_changed(os.path.join(dest_dir_path, section, FEED_NAME),
+                         iter_feed(index, section, origin, basepath, site_title))
+
+
+def update_site_index(connection, pages, titles, dest_dir_path, basepath,
+                      origin=None, read_title=None):
+    # pages is the manifest's {source: {"hash", "output"}}, titles holds
+    # the pages rendered this run. Only those, plus pages the index has an
+    # out of date row for, get touched; the sitemap and feeds are written
+    # again only when a row changed or the site's address did.
+    index = SiteIndex(connection)
+    known = index.hashes()
+    changed = 0
+    with index.connection:
+        for source, entry in pages.items():
+            if source not in titles and known.get(source) == entry["hash"]:
+                continue
+            title = titles.get(source)
+            if title is None:
+                title = read_title(source)
+            index.put(source, entry["output"],
+                      page_url(entry["output"], dest_dir_path), title,
+                      entry["hash"], os.stat(source).st_mtime_ns)
+            changed += 1
+        for source in set(known) - set(pages):
+            index.remove(source)
+            changed += 1
+
+        if origin:
+            address = f"{origin}|{basepath}"
+            sitemap_path = os.path.join(dest_dir_path, SITEMAP_NAME)
+            if (changed or index.get_meta("address") != address or
+                    not os.path.exists(sitemap_path)):
+                home = index.connection.execute(
+                    "SELECT title FROM pages WHERE url = ''").fetchone()
+                write_site_files(index, dest_dir_path, origin, basepath,
+                                 home[0] if home else origin)
+                index.set_meta("address", address)
+                print(f"Wrote sitemap and feeds ({changed} pages changed).")
+    return changed
@@ -0,0 +1,63 @@
+import random
+
+WORDS = (
+    "the ring of power was forged in the fires of mount doom by sauron "
+    "and carried across middle earth by frodo sam merry and pippin while "
+    "gandalf aragorn legolas gimli and boromir kept watch over the road"
+).split()
+
+
+def generate_words(rng, count):
+    return " ".join(rng.choice(WORDS) for _ in range(count))
+
+
+def generate_inline(rng, words, link_density):
+    # link_density is the chance that any one word becomes inline markup
+    parts = []
+    for _ in range(words):
+        word = rng.choice(WORDS)
+        if rng.random() >= link_density:
+            parts.append(word)
+            continue
+        kind = rng.randrange(5)
+        if kind == 0:
+            parts.append(f"[{word}](/blog/{word})")
+        elif kind == 1:
+            parts.append(f"![{word}](/images/{word}.png)")
+        elif kind == 2:
+            parts.append(f"**{word}**")
+        elif kind == 3:
+            parts.append(f"_{word}_")
+        else:
+            parts.append(f"`{word}`")
+    return " ".join(parts)
+
+
+def generate_markdown(seed=0, sections=20, headings=1, paragraphs=3,
+                      paragraph_words=80, link_density=0.05, list_length=5):
+    rng = random.Random(seed)
+    blocks = [f"# {generate_words(rng, 4).title()}"]
+    for section in range(sections):
+        for level in range(headings):
+            blocks.append(f"{'#' * min(level + 2, 6)} {generate_words(rng, 5)}")
+        for _ in range(paragraphs):
+            lines = []
+            remaining = paragraph_words
+            while remaining > 0:
+                line_words = min(remaining, 12)
+                lines.append(generate_inline(rng, line_words, link_density))
+                remaining -= line_words
+            blocks.append("\n".join(lines))
+        if list_length:
+            if section % 2:
+                blocks.append("\n".join(
+                    f"{i}. {generate_inline(rng, 6, link_density)}"
+                    for i in range(1, list_length + 1)))
+            else:
+                blocks.append("\n".join(
+                    f"- {generate_inline(rng, 6, link_density)}"
+                    for _ in range(list_length)))
+        if section % 5 == 4:
+            blocks.append(f"> {generate_words(rng, 20)}\n> -- someone")
+            blocks.append(f"```\n{generate_words(rng, 10)}\n{generate_words(rng, 10)}\n```")
+    return "\n\n".join(blocks) + "\n"
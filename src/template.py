@@ -0,0 +1,159 @@
+import os
+import re
+
+PLACEHOLDER = re.compile(r"{{\s*(\w+)\s*}}")
+INCLUDE = re.compile(r"{{>\s*([\w./-]+)\s*}}")
+# a content directory with this file uses it for its pages (and those of
+# its subdirectories); foo.md can have its own in foo.template.html
+DIRECTORY_TEMPLATE = "template.html"
+PAGE_TEMPLATE_SUFFIX = ".template.html"
+ROOT_REFERENCE = re.compile(r'(href|src)="/')
+ASSET_REFERENCE = re.compile(r'(href|src)="/([^"?#]*)')
+
+_template_cache = {}
+
+
+def rebase(text, basepath, asset_map=None):
+    if asset_map:
+        # swap in the fingerprinted name for known assets while prefixing
+        # the basepath, anything else just gets the basepath
+        return ASSET_REFERENCE.sub(
+            lambda match: f'{match.group(1)}="{basepath}'
+                          f'{asset_map.get(match.group(2), match.group(2))}',
+            text)
+    if basepath == "/":
+        return text
+    return ROOT_REFERENCE.sub(lambda match: f'{match.group(1)}="{basepath}', text)
+
+
+class Template:
+    def __init__(self, source, dependencies=()):
+        # literals[i] comes before names[i]; there is one more literal than
+        # there are names, so rendering just interleaves the two lists
+        self.literals = []
+        self.names = []
+        position = 0
+        for match in PLACEHOLDER.finditer(source):
+            self.literals.append(source[position:match.start()])
+            self.names.append(match.group(1))
+            position = match.end()
+        self.literals.append(source[position:])
+        self.placeholders = [match.group(0)
+                             for match in PLACEHOLDER.finditer(source)]
+        # only the last basepath and asset map are kept: a build renders
+        # every page with the same ones, though pool workers unpickle an
+        # equal copy of the map with each page
+        self._rebased = None
+        # the template file and every partial it pulled in
+        self.dependencies = list(dependencies)
+
+    def rebased_literals(self, basepath, asset_map=None):
+        cached = self._rebased
+        if cached is None or cached[0] != basepath or cached[1] != asset_map:
+            literals = [rebase(literal, basepath, asset_map)
+                        for literal in self.literals]
+            cached = (basepath, asset_map, literals)
+            self._rebased = cached
+        return cached[2]
+
+    def iter_render(self, values, basepath="/", asset_map=None):
+        literals = self.rebased_literals(basepath, asset_map)
+        for i, name in enumerate(self.names):
+            yield literals[i]
+            if name in values:
+                value = values[name]
+                if isinstance(value, str):
+                    yield rebase(value, basepath, asset_map)
+                else:
+                    # a chunk stream from HtmlNode.iter_html; every chunk is
+                    # a whole tag or text run, so href="/ never straddles two
+                    for chunk in value:
+                        yield rebase(chunk, basepath, asset_map)
+            else:
+                # unknown placeholders are left as written
+                yield self.placeholders[i]
+        yield literals[-1]
+
+    def render(self, values, basepath="/", asset_map=None):
+        return "".join(self.iter_render(values, basepath, asset_map))
+
+    def write(self, file, values, basepath="/", asset_map=None):
+        file.writelines(self.iter_render(values, basepath, asset_map))
+
+
+def expand_includes(template_path, including=()):
+    # {{> name }} is replaced by the named file, found next to the file that
+    # includes it; partials can include partials of their own
+    if template_path in including:
+        chain = " -> ".join(including + (template_path,))
+        raise ValueError(f"Template include cycle: {chain}")
+    with open(template_path) as file:
+        source = file.read()
+    dependencies = [template_path]
+    directory = os.path.dirname(template_path)
+    pieces = []
+    position = 0
+    for match in INCLUDE.finditer(source):
+        partial_source, partial_dependencies = expand_includes(
+            os.path.normpath(os.path.join(directory, match.group(1))),
+            including + (template_path,))
+        pieces.append(source[position:match.start()])
+        pieces.append(partial_source)
+        position = match.end()
+        dependencies.extend(path for path in partial_dependencies
+                            if path not in dependencies)
+    pieces.append(source[position:])
+    return "".join(pieces), dependencies
+
+
+def file_key(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def load_template(template_path):
+    # compiled templates are reused until the file or one of its partials
+    # changes on disk
+    cached = _template_cache.get(template_path)
+    if cached is not None:
+        try:
+            if all(file_key(path) == key for path, key in cached[0]):
+                return cached[1]
+        except FileNotFoundError:
+            pass
+    source, dependencies = expand_includes(template_path)
+    keys = [(path, file_key(path)) for path in dependencies]
+    template = Template(source, dependencies)
+    _template_cache[template_path] = (keys, template)
+    return template
+
+
+def select_template(from_path, content_dir, default_template, directories=None):
+    # foo.template.html next to foo.md, else the nearest template.html from
+    # the page's directory up to content_dir, else the site-wide template;
+    # directories caches the answer per directory across calls
+    page_template = from_path[:-3] + PAGE_TEMPLATE_SUFFIX
+    if os.path.isfile(page_template):
+        return page_template
+    if directories is None:
+        directories = {}
+    content_dir = os.path.normpath(content_dir)
+    directory = os.path.normpath(os.path.dirname(from_path))
+    visited = []
+    template = default_template
+    while True:
+        if directory in directories:
+            template = directories[directory]
+            break
+        visited.append(directory)
+        candidate = os.path.join(directory, DIRECTORY_TEMPLATE)
+        if os.path.isfile(candidate):
+            template = candidate
+            break
+        parent = os.path.dirname(directory)
+        if directory == content_dir or parent == directory:
+            break
+        directory = parent
+    for path in visited:
+        directories[path] = template
+    return template
@@ -0,0 +1,78 @@
+import os
+import unittest
+
+from assets import fingerprint_name, hash_assets, fingerprint_static, ASSET_MANIFEST_NAME
+from filefunctions import sync_static_to_public
+from manifest import hash_file, read_json
+from template import Template
+from fixtures import SiteTestCase, write_file
+
+
+class TestFingerprint(SiteTestCase):
+    TEMPLATE = '<link href="/index.css">{{ Content }}'
+    PAGES = {"index.md": "# Home\n\n![a](/images/a.png) [b](/blog/)"}
+    STATIC = {"index.css": "body {}", "images/a.png": "png"}
+
+    def setUp(self):
+        super().setUp()
+        self.hash_cache = os.path.join(self.root, ".cache", "asset-hashes.json")
+
+    def fingerprint(self):
+        sync_static_to_public(self.static, self.docs)
+        return fingerprint_static(self.static, self.docs,
+                                  hash_cache=self.hash_cache)
+
+    def test_fingerprint_name(self):
+        self.assertEqual(fingerprint_name("images/a.png", "0123456789abcdef"),
+                         "images/a.0123456789.png")
+
+    def test_assets_copied_under_fingerprinted_names(self):
+        asset_map = self.fingerprint()
+        digest = hash_file(os.path.join(self.static, "index.css"))
+        self.assertEqual(asset_map["index.css"], f"index.{digest[:10]}.css")
+        self.assertTrue(os.path.exists(
+            os.path.join(self.docs, *asset_map["images/a.png"].split("/"))))
+        self.assertEqual(read_json(os.path.join(
+            self.docs, ASSET_MANIFEST_NAME)), asset_map)
+
+    def test_unchanged_assets_not_rehashed(self):
+        paths = [os.path.join(self.static, "index.css")]
+        _, cache, hashed = hash_assets(paths)
+        self.assertEqual(hashed, 1)
+        hashes, _, hashed = hash_assets(paths, cache)
+        self.assertEqual(hashed, 0)
+        self.assertEqual(hashes[paths[0]], hash_file(paths[0]))
+
+    def test_changed_asset_replaces_old_copy(self):
+        old_name = self.fingerprint()["index.css"]
+        write_file(os.path.join(self.static, "index.css"), "body { x: 1 }")
+        new_name = self.fingerprint()["index.css"]
+        self.assertNotEqual(old_name, new_name)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, old_name)))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, new_name)))
+
+    def test_references_rewritten(self):
+        asset_map = self.fingerprint()
+        self.build("/site/", asset_map=asset_map)
+        page = self.read("index.html")
+        self.assertIn(f'href="/site/{asset_map["index.css"]}"', page)
+        self.assertIn(f'src="/site/{asset_map["images/a.png"]}"', page)
+        self.assertIn('href="/site/blog/"', page)
+
+    def test_asset_change_rebuilds_pages(self):
+        self.build(asset_map=self.fingerprint())
+        write_file(os.path.join(self.static, "index.css"), "body { x: 1 }")
+        asset_map = self.fingerprint()
+        stats = self.build(asset_map=asset_map)
+        self.assertEqual(stats.written, 1)
+
+    def test_template_without_map_unchanged(self):
+        template = Template('<a href="/x.css">{{ Content }}</a>')
+        self.assertEqual(template.render({"Content": "y"}, "/", {}),
+                         '<a href="/x.css">y</a>')
+        self.assertEqual(template.render({"Content": "y"}, "/", {"x.css": "x.1.css"}),
+                         '<a href="/x.1.css">y</a>')
+
+
+if __name__ == "__main__":
+    unittest.main()
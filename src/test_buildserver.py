@@ -0,0 +1,91 @@
+import io
+import os
+import threading
+import unittest
+
+from buildclient import request_build
+from buildserver import make_build_server
+from fixtures import SiteTestCase, write_file
+
+
+class TestBuildServer(SiteTestCase):
+    STATIC = {"index.css": "body {}"}
+
+    def setUp(self):
+        super().setUp()
+        self.old_cwd = os.getcwd()
+        os.chdir(self.root)
+        self.socket_path = os.path.join(self.root, "build.sock")
+        self.server = make_build_server(self.socket_path)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        os.chdir(self.old_cwd)
+        super().tearDown()
+
+    def request(self, *argv):
+        output = io.StringIO()
+        status = request_build(argv, self.socket_path, output)
+        return status, output.getvalue()
+
+    def test_builds_and_streams_output(self):
+        status, output = self.request("/site/")
+        self.assertEqual(status, 0)
+        self.assertIn("Home|", self.read("index.html"))
+        self.assertIn("body {}", self.read("index.css"))
+        self.assertIn("index.md", output)
+
+    def test_repeated_builds_pick_up_changes(self):
+        self.request()
+        write_file(os.path.join(self.content, "index.md"), "# Welcome")
+        status, _ = self.request()
+        self.assertEqual(status, 0)
+        self.assertIn("Welcome|", self.read("index.html"))
+
+    def test_parallel_build_output_stays_whole(self):
+        for name in ("one", "two", "three"):
+            write_file(os.path.join(self.content, name, "index.md"), f"# {name}")
+        status, output = self.request("-j", "2")
+        self.assertEqual(status, 0)
+        lines = output.splitlines()
+        self.assertEqual(lines.count("...Markdown generation completed."), 4)
+        pool = self.server.pools[2]
+        write_file(os.path.join(self.content, "one", "index.md"), "# One")
+        write_file(os.path.join(self.content, "two", "index.md"), "# Two")
+        self.assertEqual(self.request("-j", "2")[0], 0)
+        self.assertIs(self.server.pools[2], pool)
+        self.assertIn("One|", self.read("one", "index.html"))
+
+    def test_bad_arguments_keep_server_running(self):
+        status, output = self.request("--no-such-option")
+        self.assertEqual(status, 2)
+        self.assertIn("unrecognized arguments", output)
+        status, output = self.request("--var", "broken")
+        self.assertEqual(status, 1)
+        self.assertIn("--var expects NAME=VALUE", output)
+        self.assertEqual(self.request()[0], 0)
+
+    def test_watch_refused(self):
+        status, output = self.request("--watch")
+        self.assertEqual(status, 2)
+        self.assertIn("--watch", output)
+
+    def test_other_directory_refused(self):
+        os.chdir(self.old_cwd)
+        try:
+            status, output = self.request()
+        finally:
+            os.chdir(self.root)
+        self.assertEqual(status, 2)
+        self.assertFalse(os.path.exists(self.docs))
+
+    def test_second_server_refused(self):
+        with self.assertRaises(SystemExit):
+            make_build_server(self.socket_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
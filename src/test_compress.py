@@ -0,0 +1,81 @@
+import os
+import gzip
+import tempfile
+import unittest
+
+from compress import compress_output
+from fixtures import write_file
+
+
+class TestCompress(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.docs = self.temp_dir.name
+        self.page = os.path.join(self.docs, "blog", "index.html")
+        write_file(self.page, "<p>hello</p>" * 500)
+        write_file(os.path.join(self.docs, "small.css"), "body {}")
+        write_file(os.path.join(self.docs, "image.png"), "x" * 5000)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_gzip_sibling_written(self):
+        totals = compress_output(self.docs, min_size=100)
+        with gzip.open(self.page + ".gz", "rt") as file:
+            self.assertEqual(file.read(), "<p>hello</p>" * 500)
+        before, after = totals[".gz"]
+        self.assertEqual(before, 6000)
+        self.assertLess(after, before)
+
+    def test_small_and_binary_files_skipped(self):
+        compress_output(self.docs, min_size=100)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.docs, "small.css.gz")))
+        self.assertFalse(os.path.exists(
+            os.path.join(self.docs, "image.png.gz")))
+
+    def test_current_sibling_not_rewritten(self):
+        compress_output(self.docs, min_size=100)
+        with open(self.page + ".gz", "ab") as file:
+            file.write(b"marker")
+        os.utime(self.page + ".gz", ns=(0, os.stat(self.page).st_mtime_ns))
+        compress_output(self.docs, min_size=100)
+        with open(self.page + ".gz", "rb") as file:
+            self.assertTrue(file.read().endswith(b"marker"))
+
+    def test_changed_file_recompressed(self):
+        compress_output(self.docs, min_size=100)
+        write_file(self.page, "<p>changed</p>" * 500)
+        compress_output(self.docs, min_size=100)
+        with gzip.open(self.page + ".gz", "rt") as file:
+            self.assertEqual(file.read(), "<p>changed</p>" * 500)
+
+    def test_orphaned_sibling_removed(self):
+        compress_output(self.docs, min_size=100)
+        os.remove(self.page)
+        compress_output(self.docs, min_size=100)
+        self.assertFalse(os.path.exists(self.page + ".gz"))
+
+    def test_precompressed_static_file_kept(self):
+        # data.json.gz came from static/, not from this stage
+        data = os.path.join(self.docs, "data.json")
+        write_file(data, "[1]" * 500)
+        with open(data + ".gz", "wb") as file:
+            file.write(b"shipped")
+        write_file(os.path.join(self.docs, "feed.xml.gz"), "shipped")
+        for _ in range(2):
+            compress_output(self.docs, min_size=100)
+            with open(data + ".gz", "rb") as file:
+                self.assertEqual(file.read(), b"shipped")
+            self.assertTrue(os.path.exists(os.path.join(self.docs, "feed.xml.gz")))
+
+    def test_parallel_matches_serial(self):
+        write_file(os.path.join(self.docs, "other.html"), "<div></div>" * 500)
+        serial = compress_output(self.docs, min_size=100)
+        for name in ("other.html.gz", os.path.join("blog", "index.html.gz")):
+            os.remove(os.path.join(self.docs, name))
+        self.assertEqual(compress_output(self.docs, jobs=2, min_size=100), serial)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import functions
+from doccache import DocumentCache, document_key, encode_document, decode_document
+from functions import generate_pages_recursively, parse_document
+from buildoptions import BuildOptions
+from profiler import StageTimer
+from fixtures import SiteTestCase, write_file
+
+
+class TestDocumentCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache_dir = os.path.join(self.temp_dir.name, "cache")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_encode_round_trip(self):
+        data = encode_document("Tïtle", "<div>body</div>" * 100)
+        self.assertLess(len(data), 200)
+        self.assertEqual(decode_document(data), ("Tïtle", "<div>body</div>" * 100))
+
+    def test_key_depends_on_parser_version(self):
+        self.assertNotEqual(document_key("# a", 1), document_key("# a", 2))
+        self.assertEqual(document_key("# a", 1), document_key("# a", 1))
+
+    def test_damaged_entry_is_a_miss(self):
+        cache = DocumentCache(self.cache_dir)
+        cache.put("ab12", "t", "b")
+        with open(cache.path("ab12"), "wb") as file:
+            file.write(b"junk")
+        self.assertIsNone(cache.get("ab12"))
+
+    def test_parse_document_uses_cache(self):
+        markdown = "# Title\n\nSome **text**"
+        first = parse_document(markdown, self.cache_dir)
+        self.assertEqual(first, ("Title", "<div><h1>Title</h1><p>Some <b>text</b></p></div>"))
+        with mock.patch.object(functions, "markdown_to_html_node") as parse:
+            self.assertEqual(parse_document(markdown, self.cache_dir), first)
+            parse.assert_not_called()
+
+    def test_template_change_skips_parsing(self):
+        root = self.temp_dir.name
+        content = os.path.join(root, "content")
+        os.makedirs(content)
+        with open(os.path.join(content, "index.md"), "w") as file:
+            file.write("# Home\n\nhello")
+        template = os.path.join(root, "template.html")
+        with open(template, "w") as file:
+            file.write("{{ Content }}")
+        docs = os.path.join(root, "docs")
+        generate_pages_recursively(content, template, docs,
+                                   BuildOptions(cache_dir=self.cache_dir))
+        with open(template, "w") as file:
+            file.write("<main>{{ Content }}</main>")
+        with mock.patch.object(functions, "markdown_to_html_node") as parse:
+            generate_pages_recursively(content, template, docs,
+                                       BuildOptions(cache_dir=self.cache_dir))
+            parse.assert_not_called()
+        with open(os.path.join(docs, "index.html")) as file:
+            self.assertEqual(file.read(), "<main><div><h1>Home</h1><p>hello</p></div></main>")
+
+    def test_timed_parse_matches_cached_parse(self):
+        markdown = "# Title\n\nSome **text**\n\n- a\n- b"
+        timer = StageTimer()
+        self.assertEqual(parse_document(markdown, self.cache_dir, timer=timer),
+                         parse_document(markdown, self.cache_dir))
+        self.assertEqual(timer.stages["inline_parse"][1], 3)
+        self.assertIn("to_html", timer.stages)
+
+
+class TestCachePruning(SiteTestCase):
+    PAGES = {"index.md": "# Home", "blog/post.md": "# Post"}
+
+    def entries(self):
+        names = set()
+        for _, _, files in os.walk(self.cache_dir):
+            names.update(name[:-4] for name in files if name.endswith(".bin"))
+        return names
+
+    def test_stale_entries_pruned(self):
+        self.build(cache_dir=self.cache_dir, index_path=self.index_path, search=True)
+        first = self.entries()
+        self.assertEqual(len(first), 4)
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Edited")
+        self.build(cache_dir=self.cache_dir, index_path=self.index_path, search=True)
+        second = self.entries()
+        self.assertEqual(len(second), 4)
+        self.assertEqual(len(first & second), 2)
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.build(cache_dir=self.cache_dir, index_path=self.index_path, search=True)
+        self.assertEqual(self.entries(), first & second)
+
+    def test_skipped_pages_keep_their_entries(self):
+        self.build(cache_dir=self.cache_dir)
+        entries = self.entries()
+        self.build(cache_dir=self.cache_dir)
+        self.assertEqual(self.entries(), entries)
+
+
+if __name__ == "__main__":
+    unittest.main()
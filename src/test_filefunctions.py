@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+
+from filefunctions import sync_static_to_public
+from fixtures import write_file
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.static = os.path.join(self.temp_dir.name, "static")
+        self.docs = os.path.join(self.temp_dir.name, "docs")
+        write_file(os.path.join(self.static, "index.css"), "body {}")
+        write_file(os.path.join(self.static, "images", "a.png"), "png")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_first_sync_copies_everything(self):
+        copied, removed = sync_static_to_public(self.static, self.docs)
+        self.assertEqual((copied, removed), (2, 0))
+        self.assertTrue(os.path.exists(
+            os.path.join(self.docs, "images", "a.png")))
+
+    def test_unchanged_assets_not_copied(self):
+        sync_static_to_public(self.static, self.docs)
+        copied, removed = sync_static_to_public(self.static, self.docs)
+        self.assertEqual((copied, removed), (0, 0))
+
+    def test_changed_asset_copied(self):
+        sync_static_to_public(self.static, self.docs)
+        write_file(os.path.join(self.static, "index.css"), "body { x: 1 }")
+        copied, _ = sync_static_to_public(self.static, self.docs)
+        self.assertEqual(copied, 1)
+        with open(os.path.join(self.docs, "index.css")) as file:
+            self.assertEqual(file.read(), "body { x: 1 }")
+
+    def test_checksum_ignores_touched_asset(self):
+        sync_static_to_public(self.static, self.docs)
+        os.utime(os.path.join(self.static, "index.css"), ns=(0, 0))
+        copied, _ = sync_static_to_public(
+            self.static, self.docs, checksum=True)
+        self.assertEqual(copied, 0)
+
+    def test_orphans_removed_pages_kept(self):
+        sync_static_to_public(self.static, self.docs)
+        write_file(os.path.join(self.docs, "index.html"), "<p>page</p>")
+        os.remove(os.path.join(self.static, "images", "a.png"))
+        _, removed = sync_static_to_public(self.static, self.docs)
+        self.assertEqual(removed, 1)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "images")))
+        self.assertTrue(os.path.exists(os.path.join(self.docs, "index.html")))
+
+
+if __name__ == "__main__":
+    unittest.main()
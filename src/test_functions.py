@@ -1,8 +1,15 @@
+import os
+import tempfile
 import unittest
 
 from parentnode import ParentNode
 from textnode import TextNode, TextType
 from functions import *
+from buildoptions import BuildOptions
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTENT_DIR = os.path.join(REPO_DIR, "content")
+TEMPLATE_PATH = os.path.join(REPO_DIR, "template.html")
 
 
 class TestFunctions(unittest.TestCase):
@@ -45,7 +52,8 @@ class TestFunctions(unittest.TestCase):
         self.assertEqual(html_node.tag, "img")
         self.assertEqual(html_node.value, "")
         self.assertEqual(html_node.props, {
-                         "src": "www.example.com/image.png", "alt": "This is an image node"})
+                         "src": "www.example.com/image.png", "alt": "This is an image node",
+                         "loading": "lazy", "decoding": "async"})
 
     # TESTING split_nodes_delimiter
     def test_bold_split(self):
@@ -244,6 +252,30 @@ class TestFunctions(unittest.TestCase):
         actual = text_to_textnodes(text)
         self.assertEqual(actual, expected)
 
+    def test_split_images_and_links_keep_empty_text(self):
+        text = "![a](/a.png)[b](/b)"
+        expected = [
+            TextNode("", TextType.TEXT),
+            TextNode("a", TextType.IMAGE, "/a.png"),
+            TextNode("", TextType.TEXT),
+            TextNode("b", TextType.LINK, "/b"),
+        ]
+        self.assertEqual(text_to_textnodes(text), expected)
+
+    def test_split_link_leaves_images_alone(self):
+        node = TextNode("an ![image](/i.png) and a [link](/l)", TextType.TEXT)
+        self.assertEqual(split_nodes_link([node]), [
+            TextNode("an ![image](/i.png) and a ", TextType.TEXT),
+            TextNode("link", TextType.LINK, "/l"),
+        ])
+
+    def test_split_many_links(self):
+        text = " ".join(f"[link {i}](/page{i})" for i in range(5000))
+        nodes = text_to_textnodes(text)
+        self.assertEqual(len(nodes), 10000)
+        self.assertEqual(nodes[-1], TextNode(
+            "link 4999", TextType.LINK, "/page4999"))
+
     def test_split_simple(self):
         text = "This is simple"
         expected = [TextNode("This is simple", TextType.TEXT),]
@@ -290,6 +322,23 @@ This is another paragraph with _italic_ text and `code` here
             ],
         )
 
+    def test_markdown_to_blocks_trailing_newlines(self):
+        self.assertEqual(markdown_to_blocks("para\n\n\n"), ["para"])
+
+    def test_iter_markdown_blocks_from_file_lines(self):
+        lines = ["# Title\n", "\n", "- one\n", "- two\n", "\n", "\n", "end"]
+        self.assertEqual(list(iter_markdown_blocks(lines)),
+                         ["# Title", "- one\n- two", "end"])
+
+    def test_iter_block_nodes_is_lazy(self):
+        lines = iter(["# Title", "", "```", "code", ""])
+        nodes = iter_block_nodes(lines)
+        self.assertEqual(next(nodes).to_html(), "<h1>Title</h1>")
+        self.assertEqual(next(lines), "```")
+
+    def test_blocktype_code_trailing_newline(self):
+        self.assertEqual(block_to_block_type("```\ncode\n```\n"), BlockType.CODE)
+
     def test_blocktype_paragraph(self):
         test_block = "This is **bolded** paragraph"
         self.assertEqual(block_to_block_type(test_block), BlockType.PARAGRAPH)
@@ -491,3 +540,69 @@ This is a paragraph and a list
 
     if __name__ == "__main__":
         unittest.main()
+
+
+class TestParallelBuild(unittest.TestCase):
+    def read_tree(self, root):
+        tree = {}
+        for directory, _, names in os.walk(root):
+            for name in names:
+                if name.endswith(".html"):
+                    path = os.path.join(directory, name)
+                    with open(path, "rb") as file:
+                        tree[os.path.relpath(path, root)] = file.read()
+        return tree
+
+    def test_parallel_output_matches_serial(self):
+        with tempfile.TemporaryDirectory() as root:
+            serial = os.path.join(root, "serial")
+            parallel = os.path.join(root, "parallel")
+            generate_pages_recursively(
+                CONTENT_DIR, TEMPLATE_PATH, serial, BuildOptions("/base/", jobs=1))
+            generate_pages_recursively(
+                CONTENT_DIR, TEMPLATE_PATH, parallel, BuildOptions("/base/", jobs=3))
+            serial_tree = self.read_tree(serial)
+            self.assertEqual(len(serial_tree), 5)
+            self.assertEqual(serial_tree, self.read_tree(parallel))
+
+
+class TestStreamingPage(unittest.TestCase):
+    def test_streaming_matches_regular_page(self):
+        with tempfile.TemporaryDirectory() as root:
+            for name in ("index.md", os.path.join("blog", "tom", "index.md")):
+                source = os.path.join(CONTENT_DIR, name)
+                regular = os.path.join(root, "regular.html")
+                streamed = os.path.join(root, "streamed.html")
+                generate_page(source, TEMPLATE_PATH, regular, BuildOptions("/base/"))
+                record = generate_page(source, TEMPLATE_PATH, streamed,
+                                       BuildOptions("/base/", stream_threshold=0))
+                self.assertTrue(record["written"])
+                with open(regular) as first, open(streamed) as second:
+                    self.assertEqual(first.read(), second.read())
+
+    def test_streaming_memory_is_bounded_by_block(self):
+        import tracemalloc
+        from synthetic import generate_markdown
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "big.md")
+            with open(source, "w") as file:
+                file.write(generate_markdown(sections=1500))
+            size = os.path.getsize(source)
+            tracemalloc.start()
+            generate_page(source, TEMPLATE_PATH, os.path.join(root, "big.html"),
+                          BuildOptions(stream_threshold=0))
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            self.assertGreater(size, 1_000_000)
+            self.assertLess(peak, size / 4)
+
+    def test_streaming_empty_document_fails(self):
+        with tempfile.TemporaryDirectory() as root:
+            source = os.path.join(root, "empty.md")
+            destination = os.path.join(root, "empty.html")
+            with open(source, "w") as file:
+                file.write("\n\n")
+            with self.assertRaises(Exception):
+                generate_page(source, TEMPLATE_PATH, destination,
+                              BuildOptions(stream_threshold=0))
+            self.assertFalse(os.path.exists(destination))
@@ -1,6 +1,15 @@
 import unittest
 
-from htmlnode import HtmlNode
+from htmlnode import HtmlNode, ENTER, EXIT
+from leafnode import LeafNode
+from parentnode import ParentNode
+
+
+def deep_tree(depth, leaf_value="leaf"):
+    node = LeafNode("span", leaf_value)
+    for _ in range(depth):
+        node = ParentNode("div", [node])
+    return node
 
 
 class TestHTMLNode(unittest.TestCase):
@@ -47,6 +56,55 @@ class TestHTMLNode(unittest.TestCase):
         node2 = HtmlNode(props={"href": "http://www.example.com/login"})
         self.assertNotEqual(node, node2)
 
+    def test_nodes_have_no_instance_dict(self):
+        self.assertFalse(hasattr(HtmlNode("p", "text"), "__dict__"))
+
+    def test_leaf_nodes_share_empty_children(self):
+        self.assertIs(LeafNode("b", "x").children, LeafNode("i", "y").children)
+        self.assertEqual(LeafNode("b", "x"), HtmlNode("b", "x"))
+
+    def test_walk_events(self):
+        leaf = LeafNode("b", "x")
+        text = LeafNode(None, "y")
+        root = ParentNode("p", [leaf, text])
+        self.assertEqual(list(root.walk()), [
+            (ENTER, root), (ENTER, leaf), (EXIT, leaf),
+            (ENTER, text), (EXIT, text), (EXIT, root),
+        ])
+        self.assertEqual(list(root.preorder()), [root, leaf, text])
+        self.assertEqual(list(root.postorder()), [leaf, text, root])
+
+    def test_repr_nested(self):
+        node = ParentNode("p", [LeafNode("a", "x", {"href": "/"}), LeafNode(None, "y")])
+        self.assertEqual(repr(node), (
+            "HtmlNode(tag='p', value=None, children=[\n"
+            "    HtmlNode(tag='a', value='x', props={\n"
+            "    'href': '/'\n"
+            "}),\n"
+            "    HtmlNode(tag=None, value='y', props=None)\n"
+            "]"
+            ")"
+        ))
+
+    def test_deep_tree_eq_and_repr(self):
+        self.assertEqual(deep_tree(5000), deep_tree(5000))
+        self.assertNotEqual(deep_tree(5000), deep_tree(5000, "other"))
+        self.assertTrue(repr(deep_tree(3000)).startswith("HtmlNode(tag='div'"))
+
+    def test_structural_hash(self):
+        self.assertEqual(deep_tree(50).structural_hash(),
+                         deep_tree(50).structural_hash())
+        self.assertNotEqual(deep_tree(50).structural_hash(),
+                            deep_tree(50, "other").structural_hash())
+        first = HtmlNode("a", "x", props={"href": "/", "id": "1"})
+        second = HtmlNode("a", "x", props={"id": "1", "href": "/"})
+        self.assertEqual(first.structural_hash(), second.structural_hash())
+
+    def test_structural_hash_stable_across_processes(self):
+        # pinned, so a hash stored by one build still matches in the next
+        tree = HtmlNode("p", None, [HtmlNode("b", "x", props={"id": "1"})])
+        self.assertEqual(tree.structural_hash(), "00c8dc26bf6f8fc7475095c2a5a381d6")
+
 
 if __name__ == "__main__":
     unittest.main()
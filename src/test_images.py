@@ -0,0 +1,147 @@
+import os
+import struct
+import tempfile
+import unittest
+
+from images import image_size, local_image_path
+from functions import text_node_to_html_node, generate_pages_recursively
+from buildoptions import BuildOptions
+from pagenotes import PageNotes
+from textnode import TextNode, TextType
+from fixtures import write_file, png_bytes
+
+
+def write_bytes(path, data):
+    with open(path, "wb") as file:
+        file.write(data)
+
+
+def jpeg_bytes(width, height):
+    exif = b"\xff\xe1" + struct.pack(">H", 2 + 100) + b"\x00" * 100
+    frame = (b"\xff\xc0" + struct.pack(">H", 11) + b"\x08" +
+             struct.pack(">HH", height, width) + b"\x01\x01\x11\x00")
+    return b"\xff\xd8" + exif + frame + b"\xff\xd9"
+
+
+def gif_bytes(width, height):
+    return b"GIF89a" + struct.pack("<HH", width, height) + b"\x00" * 20
+
+
+def webp_lossless_bytes(width, height):
+    bits = (width - 1) | ((height - 1) << 14)
+    chunk = b"\x2f" + bits.to_bytes(4, "little") + b"\x00" * 8
+    return (b"RIFF" + struct.pack("<I", 4 + 8 + len(chunk)) + b"WEBP" +
+            b"VP8L" + struct.pack("<I", len(chunk)) + chunk)
+
+
+def webp_extended_bytes(width, height):
+    chunk = (b"\x00" * 4 + (width - 1).to_bytes(3, "little") +
+             (height - 1).to_bytes(3, "little"))
+    return (b"RIFF" + struct.pack("<I", 4 + 8 + len(chunk)) + b"WEBP" +
+            b"VP8X" + struct.pack("<I", len(chunk)) + chunk + b"\x00" * 4)
+
+
+class TestImageSize(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = self.temp_dir.name
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def size_of(self, name, data):
+        path = os.path.join(self.root, name)
+        write_bytes(path, data)
+        return image_size(path)
+
+    def test_png(self):
+        self.assertEqual(self.size_of("a.png", png_bytes(640, 480)), (640, 480))
+
+    def test_jpeg_after_large_segment(self):
+        self.assertEqual(self.size_of("a.jpg", jpeg_bytes(1024, 768)), (1024, 768))
+
+    def test_gif(self):
+        self.assertEqual(self.size_of("a.gif", gif_bytes(16, 9)), (16, 9))
+
+    def test_webp(self):
+        self.assertEqual(self.size_of("a.webp", webp_lossless_bytes(300, 200)),
+                         (300, 200))
+        self.assertEqual(self.size_of("b.webp", webp_extended_bytes(5000, 40)),
+                         (5000, 40))
+
+    def test_unknown_format(self):
+        self.assertIsNone(self.size_of("a.txt", b"not an image at all"))
+        self.assertIsNone(image_size(os.path.join(self.root, "missing.png")))
+
+    def test_rewritten_image_picked_up(self):
+        path = os.path.join(self.root, "a.png")
+        write_bytes(path, png_bytes(10, 10))
+        self.assertEqual(image_size(path), (10, 10))
+        write_bytes(path, png_bytes(20, 30) + b"\x00")
+        self.assertEqual(image_size(path), (20, 30))
+
+    def test_local_image_path(self):
+        self.assertEqual(local_image_path("/images/a.png?v=1", "static"),
+                         os.path.join("static", "images", "a.png"))
+        self.assertIsNone(local_image_path("https://example.com/a.png", "static"))
+        self.assertIsNone(local_image_path("//example.com/a.png", "static"))
+
+    def test_image_node_gets_dimensions(self):
+        os.makedirs(os.path.join(self.root, "images"))
+        write_bytes(os.path.join(self.root, "images", "a.png"), png_bytes(64, 32))
+        node = TextNode("alt text", TextType.IMAGE, "/images/a.png")
+        notes = PageNotes(self.root)
+        self.assertEqual(
+            text_node_to_html_node(node, notes).to_html(),
+            '<img src="/images/a.png" alt="alt text" width="64" height="32" '
+            'loading="lazy" decoding="async"></img>')
+        self.assertEqual(notes.images,
+                         {os.path.join(self.root, "images", "a.png"): [64, 32]})
+
+
+class TestImagePages(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.image = os.path.join(self.static, "images", "tom.png")
+        write_file(self.template, "{{ Title }}|{{ Content }}")
+        write_file(os.path.join(self.content, "index.md"),
+                   "# Home\n\n![tom](/images/tom.png)")
+        write_file(os.path.join(self.content, "other.md"), "# Other")
+        os.makedirs(os.path.dirname(self.image))
+        write_bytes(self.image, png_bytes(10, 20))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build(self):
+        return generate_pages_recursively(self.content, self.template, self.docs,
+                                          BuildOptions(static_dir=self.static))
+
+    def page(self):
+        with open(os.path.join(self.docs, "index.html")) as file:
+            return file.read()
+
+    def test_resized_image_rebuilds_its_pages(self):
+        self.build()
+        self.assertIn('width="10" height="20"', self.page())
+        write_bytes(self.image, png_bytes(30, 40) + b"\x00")
+        stats = self.build()
+        self.assertEqual(stats.written, 1)
+        self.assertIn('width="30" height="40"', self.page())
+        write_bytes(self.image, png_bytes(10, 20))
+        self.build()
+        self.assertIn('width="10" height="20"', self.page())
+
+    def test_unchanged_image_skips_pages(self):
+        self.build()
+        stats = self.build()
+        self.assertEqual(stats.written + stats.skipped, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import os
+import unittest
+from unittest import mock
+
+import functions
+from functions import generate_page, page_references
+from buildoptions import BuildOptions
+from linkcheck import build_target_index, target_path, check_links
+from fixtures import SiteTestCase, write_file
+
+
+class TestLinkCheck(SiteTestCase):
+    PAGES = {
+        "index.md": "# Home\n\n![tom](/images/tom.png)\n\n"
+                    "- [Tom](/blog/tom)\n- [Gone](/blog/gone)\n\n"
+                    "See [wiki](https://example.com) and [top](#top).\n"
+                    "Also ![missing](/images/missing.png) here.",
+        "blog/tom/index.md": "# Tom\n\n[Home](../../) [Self](./) [Bad](pic.png)",
+    }
+    BASEPATH = "/site/"
+
+    def setUp(self):
+        super().setUp()
+        write_file(os.path.join(self.docs, "images", "tom.png"), "")
+
+    def build(self, check=True):
+        super().build(index_path=self.index_path, check_links=check)
+
+    def check(self):
+        return sorted(check_links(self.docs, "/site/", self.index_path))
+
+    def test_target_index(self):
+        self.build()
+        targets = build_target_index(self.docs)
+        for url in ("/", "/index.html", "/blog/tom", "/blog/tom/",
+                    "/blog/tom/index.html", "/images/tom.png"):
+            self.assertIn(url, targets)
+
+    def test_target_path(self):
+        self.assertEqual(target_path("/blog/tom?x=1#top", "/"), "/blog/tom")
+        self.assertEqual(target_path("../", "/blog/tom/"), "/blog/")
+        self.assertEqual(target_path("a%20b.png", "/blog/"), "/blog/a b.png")
+        self.assertIsNone(target_path("mailto:me@example.com", "/"))
+        self.assertIsNone(target_path("//cdn.example.com/x.js", "/"))
+        self.assertIsNone(target_path("#top", "/"))
+
+    def test_references_carry_lines(self):
+        references = page_references(os.path.join(self.content, "index.md"))
+        self.assertEqual(references[0], (3, "image", "/images/tom.png"))
+        self.assertIn((6, "link", "/blog/gone"), references)
+        self.assertIn((9, "image", "/images/missing.png"), references)
+
+    def test_render_collects_same_references(self):
+        source = os.path.join(self.content, "index.md")
+        for stream_threshold in (None, 0):
+            record = generate_page(source, self.template,
+                                   os.path.join(self.docs, "x.html"),
+                                   BuildOptions(check_links=True,
+                                                stream_threshold=stream_threshold))
+            self.assertEqual(record["references"], page_references(source))
+
+    def test_broken_references_reported(self):
+        self.build()
+        index = os.path.join(self.content, "index.md")
+        tom = os.path.join(self.content, "blog", "tom", "index.md")
+        self.assertEqual(self.check(), sorted([
+            (index, 6, "link", "/blog/gone"),
+            (index, 9, "image", "/images/missing.png"),
+            (tom, 3, "link", "pic.png"),
+        ]))
+
+    def test_unchanged_pages_not_reparsed(self):
+        self.build()
+        with mock.patch.object(functions, "text_to_textnodes") as parse:
+            self.build()
+            self.assertEqual(len(self.check()), 3)
+        parse.assert_not_called()
+
+    def test_deleted_page_breaks_links_to_it(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "tom", "index.md"))
+        self.build()
+        self.assertIn((os.path.join(self.content, "index.md"), 5, "link", "/blog/tom"),
+                      self.check())
+
+    def test_pages_built_without_checking_scanned_once(self):
+        self.build(check=False)
+        self.build()
+        self.assertEqual(len(self.check()), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import os
+import unittest
+
+from manifest import MANIFEST_NAME, load_manifest
+from fixtures import SiteTestCase, write_file
+
+
+class TestManifest(SiteTestCase):
+    TEMPLATE = '<title>{{ Title }}</title><link href="/index.css">{{ Content }}'
+    PAGES = {"index.md": "# Home", "blog/post.md": "# Post"}
+
+    def build(self, basepath="/"):
+        super().build(basepath)
+        return load_manifest(self.docs)
+
+    def output_mtime(self, *parts):
+        return os.stat(os.path.join(self.docs, *parts)).st_mtime_ns
+
+    def test_manifest_written(self):
+        manifest = self.build()
+        self.assertTrue(os.path.exists(
+            os.path.join(self.docs, MANIFEST_NAME)))
+        self.assertEqual(manifest["basepath"], "/")
+        self.assertEqual(len(manifest["pages"]), 2)
+
+    def test_unchanged_pages_skipped(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "index.html"), ns=(0, 0))
+        self.build()
+        self.assertEqual(self.output_mtime("index.html"), 0)
+
+    def test_changed_page_rebuilt(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "index.html"), ns=(0, 0))
+        os.utime(os.path.join(self.docs, "blog", "post.html"), ns=(0, 0))
+        write_file(os.path.join(self.content, "index.md"), "# New home")
+        self.build()
+        self.assertNotEqual(self.output_mtime("index.html"), 0)
+        self.assertEqual(self.output_mtime("blog", "post.html"), 0)
+
+    def test_basepath_change_rebuilds_everything(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "blog", "post.html"), ns=(0, 0))
+        self.build("/site/")
+        self.assertNotEqual(self.output_mtime("blog", "post.html"), 0)
+
+    def test_template_change_rebuilds_everything(self):
+        self.build()
+        os.utime(os.path.join(self.docs, "blog", "post.html"), ns=(0, 0))
+        write_file(self.template, "<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertNotEqual(self.output_mtime("blog", "post.html"), 0)
+
+    def test_deleted_source_removes_output(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        manifest = self.build()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+        self.assertEqual(list(manifest["pages"]), [
+                         os.path.join(self.content, "index.md")])
+
+
+if __name__ == "__main__":
+    unittest.main()
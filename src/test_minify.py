@@ -0,0 +1,112 @@
+import os
+import tempfile
+import unittest
+
+from minify import HtmlMinifier, minify_html, minify_css
+from functions import generate_pages_recursively
+from buildoptions import BuildOptions
+from filefunctions import sync_static_to_public
+from fixtures import write_file
+
+
+class TestMinifyHtml(unittest.TestCase):
+    def test_whitespace_between_tags_removed(self):
+        self.assertEqual(
+            minify_html("<html>\n  <head>\n    <title>x</title>\n  </head>\n</html>\n"),
+            "<html><head><title>x</title></head></html>")
+
+    def test_inline_spaces_kept_once(self):
+        self.assertEqual(minify_html("<p>a   <b>b</b> <i>c</i>\n d</p>"),
+                         "<p>a <b>b</b> <i>c</i> d</p>")
+
+    def test_pre_and_code_preserved(self):
+        html = "<div>\n  <pre><code>x  =  1\n    y</code></pre>\n  <code>a  b</code>\n</div>"
+        self.assertEqual(minify_html(html),
+                         "<div><pre><code>x  =  1\n    y</code></pre><code>a  b</code></div>")
+
+    def test_closing_tag_case_ignored(self):
+        self.assertEqual(minify_html("<PRE>a  b</Pre>\n  <p>c  d</p>"),
+                         "<PRE>a  b</Pre><p>c d</p>")
+
+    def test_many_code_spans_in_one_chunk(self):
+        html = "<p>x <code>a  b</code> y</p>\n" * 20000
+        self.assertEqual(minify_html(html),
+                         "<p>x <code>a  b</code> y</p>" * 20000)
+
+    def test_chunks_match_whole_text(self):
+        html = ("<body>\n  <p>one  two</p>\n  <pre>keep   this\n</pre>  \n"
+                "  <p>three <b>four</b></p>\n</body>\n")
+        for size in (1, 2, 3, 7):
+            chunks = [html[i:i + size] for i in range(0, len(html), size)]
+            minifier = HtmlMinifier()
+            self.assertEqual("".join(minifier.minify(chunks)), minify_html(html))
+
+    def test_sizes_reported(self):
+        minifier = HtmlMinifier()
+        output = "".join(minifier.minify(["<p>\n  x\n</p>\n"]))
+        self.assertEqual(minifier.size_in, 13)
+        self.assertEqual(minifier.size_out, len(output))
+
+
+class TestMinifyCss(unittest.TestCase):
+    def test_comments_and_whitespace(self):
+        css = "/* theme */\nbody {\n  color: red;\n  margin: 0 auto;\n}\n\nh1, h2 > a { x: 1 }\n"
+        self.assertEqual(minify_css(css),
+                         "body{color:red;margin:0 auto}h1,h2>a{x:1}")
+
+    def test_strings_untouched(self):
+        self.assertEqual(minify_css('a::after { content: "  /* no */  " }'),
+                         'a::after{content:"  /* no */  "}')
+
+    def test_descendant_pseudo_class_kept(self):
+        self.assertEqual(minify_css("a :hover { x: 1 }"), "a :hover{x:1}")
+
+
+class TestMinifyBuild(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template,
+                   "<html>\n  <body>\n    {{ Content }}\n  </body>\n</html>\n")
+        write_file(os.path.join(self.content, "index.md"),
+                   "# Home\n\n```\nx  =  1\n```")
+        write_file(os.path.join(self.static, "index.css"), "body {\n  x: 1;\n}\n")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self, name):
+        with open(os.path.join(self.docs, name)) as file:
+            return file.read()
+
+    def test_pages_minified(self):
+        generate_pages_recursively(self.content, self.template, self.docs,
+                                   BuildOptions(minify=True))
+        self.assertEqual(
+            self.read("index.html"),
+            "<html><body><div><h1>Home</h1><pre><code>x  =  1\n</code></pre>"
+            "</div></body></html>")
+
+    def test_minify_toggle_rebuilds_pages(self):
+        generate_pages_recursively(self.content, self.template, self.docs,
+                                   BuildOptions())
+        stats = generate_pages_recursively(self.content, self.template, self.docs,
+                                           BuildOptions(minify=True))
+        self.assertEqual(stats.written, 1)
+
+    def test_css_minified_and_unchanged_on_resync(self):
+        self.assertEqual(sync_static_to_public(self.static, self.docs, minify=True),
+                         (1, 0))
+        self.assertEqual(self.read("index.css"), "body{x:1}")
+        self.assertEqual(sync_static_to_public(self.static, self.docs, minify=True),
+                         (0, 0))
+        self.assertEqual(sync_static_to_public(self.static, self.docs), (1, 0))
+        self.assertEqual(self.read("index.css"), "body {\n  x: 1;\n}\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,3 +1,4 @@
+import io
 import unittest
 
 from parentnode import ParentNode
@@ -38,6 +39,25 @@ class TestParentNode(unittest.TestCase):
         self.assertEqual(parent_node.to_html(),
                          '<div><span>child</span><a href="https://www.google.com">star</a></div>')
 
+    def test_iter_html_chunks(self):
+        parent_node = ParentNode("p", [LeafNode("b", "bold"), LeafNode(None, " text")])
+        self.assertEqual(list(parent_node.iter_html()),
+                         ["<p>", "<b>bold</b>", " text", "</p>"])
+
+    def test_write_html(self):
+        parent_node = ParentNode("div", [ParentNode("p", [LeafNode(None, "x" * 10)])] * 3)
+        output = io.StringIO()
+        parent_node.write_html(output, buffer_size=8)
+        self.assertEqual(output.getvalue(), parent_node.to_html())
+
+    def test_deep_tree_does_not_recurse(self):
+        node = LeafNode("span", "leaf")
+        for _ in range(5000):
+            node = ParentNode("div", [node])
+        html = node.to_html()
+        self.assertTrue(html.startswith("<div>" * 5000 + "<span>leaf</span>"))
+        self.assertTrue(html.endswith("</div>" * 5000))
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+
+from functions import generate_pages_recursively, generate_page
+from buildoptions import BuildOptions
+from profiler import BuildProfile, StageTimer
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CONTENT_DIR = os.path.join(REPO_DIR, "content")
+TEMPLATE_PATH = os.path.join(REPO_DIR, "template.html")
+PAGE_STAGES = {"read", "block_parse", "inline_parse",
+               "to_html", "template", "write"}
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage_timer_counts_calls(self):
+        timer = StageTimer()
+        for _ in range(3):
+            with timer.stage("parse"):
+                pass
+        self.assertEqual(timer.as_dict()["parse"]["calls"], 3)
+
+    def test_profiled_build(self):
+        with tempfile.TemporaryDirectory() as root:
+            profile = BuildProfile()
+            generate_pages_recursively(
+                CONTENT_DIR, TEMPLATE_PATH, root, BuildOptions(), profile=profile)
+            report = profile.report(slowest=2)
+            self.assertEqual(report["page_count"], 5)
+            self.assertEqual(set(report["page_stages"]), PAGE_STAGES)
+            self.assertEqual(report["page_stages"]["write"]["calls"], 5)
+            self.assertIn("render", report["build_stages"])
+            self.assertEqual(len(report["slowest_pages"]), 2)
+            self.assertGreaterEqual(report["slowest_pages"][0]["seconds"],
+                                    report["slowest_pages"][1]["seconds"])
+
+    def test_profiled_page_matches_streamed_page(self):
+        source = os.path.join(CONTENT_DIR, "index.md")
+        with tempfile.TemporaryDirectory() as root:
+            streamed = os.path.join(root, "streamed.html")
+            profiled = os.path.join(root, "profiled.html")
+            generate_page(source, TEMPLATE_PATH, streamed, BuildOptions("/base/"))
+            record = generate_page(source, TEMPLATE_PATH, profiled, BuildOptions("/base/"),
+                                   profile=True)
+            self.assertEqual(set(record["stages"]), PAGE_STAGES)
+            with open(streamed) as first, open(profiled) as second:
+                self.assertEqual(first.read(), second.read())
+
+    def test_profiled_build_keeps_streaming_large_pages(self):
+        with tempfile.TemporaryDirectory() as root:
+            profile = BuildProfile()
+            generate_pages_recursively(
+                CONTENT_DIR, TEMPLATE_PATH, root,
+                BuildOptions(stream_threshold=0, search=True,
+                             index_path=os.path.join(root, "index")),
+                profile=profile)
+            report = profile.report()
+            self.assertEqual(set(report["page_stages"]), {"stream"})
+            self.assertEqual(report["page_stages"]["stream"]["calls"], 5)
+            for page in report["pages"]:
+                self.assertNotIn("search", page)
+                self.assertNotIn("images", page)
+                self.assertGreater(page["bytes"], 0)
+
+    def test_attach_cprofile(self):
+        profile = BuildProfile()
+        profile.add_page({"source": "a.md", "seconds": 1.0, "stages": {}})
+        profile.add_page({"source": "b.md", "seconds": 2.0, "stages": {}})
+        profile.attach_cprofile(lambda page: sum(range(100)), 1)
+        slowest = profile.report()["slowest_pages"]
+        self.assertIn("function calls", slowest[0]["cprofile"])
+        self.assertNotIn("cprofile", slowest[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
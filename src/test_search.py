@@ -0,0 +1,94 @@
+import os
+import json
+import unittest
+from unittest import mock
+
+import functions
+from functions import generate_page, page_search_terms
+from buildoptions import BuildOptions
+from search import tokenize, weigh_title, shard_name
+from fixtures import SiteTestCase, write_file
+
+
+class TestSearchTerms(unittest.TestCase):
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Tom's *Merry* song_book, a 2nd time"),
+                         ["tom", "merry", "song", "book", "2nd", "time"])
+
+    def test_title_weighted(self):
+        terms = weigh_title("Elves", {"elves": 1, "and": 1, "men": 1})
+        self.assertEqual(terms, {"elves": 6, "and": 1, "men": 1})
+
+
+class TestSearchIndex(SiteTestCase):
+    PAGES = {"index.md": "# Home\n\nWelcome travellers",
+             "blog/tom/index.md": "# Tom\n\nTom is a merry fellow"}
+    BASEPATH = "/site/"
+
+    def build(self, **options):
+        super().build(index_path=self.index_path, search=True, **options)
+
+    def shard_path(self, term):
+        return os.path.join(self.docs, "search", f"{shard_name(term)}.json")
+
+    def lookup(self, term):
+        with open(os.path.join(self.docs, "search", "docs.json")) as file:
+            documents = json.load(file)
+        path = self.shard_path(term)
+        if not os.path.exists(path):
+            return []
+        with open(path) as file:
+            postings = json.load(file).get(term, [])
+        return [documents[str(doc)][0] for doc, _ in postings]
+
+    def test_pages_searchable(self):
+        self.build()
+        self.assertEqual(self.lookup("merry"), ["/site/blog/tom/"])
+        self.assertEqual(self.lookup("welcome"), ["/site/"])
+
+    def test_render_terms_match_a_separate_parse(self):
+        source = os.path.join(self.root, "mixed.md")
+        write_file(source, "# Mixed\n\n## Sub heading\n\n> quoted words\n\n"
+                           "- **bold** item [link text](/x)\n1. first one\n\n"
+                           "```\ncode words\n```\n\n![alt words](/a.png) tail")
+        for stream_threshold in (None, 0):
+            record = generate_page(source, self.template, os.path.join(self.docs, "m.html"),
+                                   BuildOptions(search=True,
+                                                stream_threshold=stream_threshold))
+            self.assertEqual(record["search"], page_search_terms(source))
+
+    def test_cached_pages_indexed_without_parsing(self):
+        self.build(cache_dir=self.cache_dir)
+        os.remove(self.index_path)
+        with mock.patch.object(functions, "text_to_textnodes") as parse:
+            self.build(cache_dir=self.cache_dir, force=True)
+        parse.assert_not_called()
+        self.assertEqual(self.lookup("merry"), ["/site/blog/tom/"])
+
+    def test_only_touched_shards_rewritten(self):
+        self.build()
+        os.utime(self.shard_path("welcome"), ns=(0, 0))
+        write_file(os.path.join(self.content, "blog", "tom", "index.md"),
+                   "# Tom\n\nTom sings loudly")
+        self.build()
+        self.assertEqual(os.stat(self.shard_path("welcome")).st_mtime_ns, 0)
+        self.assertEqual(self.lookup("sings"), ["/site/blog/tom/"])
+        self.assertEqual(self.lookup("merry"), [])
+        self.assertFalse(os.path.exists(self.shard_path("merry")))
+
+    def test_removed_page_dropped(self):
+        self.build()
+        os.remove(os.path.join(self.content, "blog", "tom", "index.md"))
+        self.build()
+        self.assertEqual(self.lookup("tom"), [])
+
+    def test_wiped_output_restored(self):
+        self.build()
+        os.remove(os.path.join(self.docs, "search", "docs.json"))
+        os.remove(self.shard_path("merry"))
+        self.build()
+        self.assertEqual(self.lookup("merry"), ["/site/blog/tom/"])
+
+
+if __name__ == "__main__":
+    unittest.main()
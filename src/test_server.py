@@ -0,0 +1,101 @@
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from server import (PageCache, PreviewSite, clean_url_path, find_source, make_server,
+                    parse_args)
+from main import parse_variables
+from fixtures import write_file
+
+
+class TestPreviewServer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        self.content = os.path.join(root, "content")
+        self.static = os.path.join(root, "static")
+        self.template = os.path.join(root, "template.html")
+        write_file(self.template, '{{ Title }}|<link href="/index.css">', 1)
+        write_file(os.path.join(self.content, "index.md"), "# Home", 1)
+        write_file(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom", 1)
+        write_file(os.path.join(self.static, "index.css"), "body {}", 1)
+        self.site = PreviewSite(self.content, self.template, self.static)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_clean_url_path(self):
+        self.assertEqual(clean_url_path("/blog/tom/?x=1"), ["blog", "tom"])
+        self.assertEqual(clean_url_path("/"), [])
+        self.assertEqual(clean_url_path("/blog/../../secret"), ["secret"])
+        self.assertEqual(clean_url_path("/site/blog/", "/site/"), ["blog"])
+        self.assertEqual(clean_url_path("/site", "/site/"), [])
+        self.assertIsNone(clean_url_path("/sitemap.xml", "/site/"))
+
+    def test_basepath_served(self):
+        site = PreviewSite(self.content, self.template, self.static, "/site/")
+        self.assertEqual(site.resolve("/site/")[:2],
+                         (200, b'Home|<link href="/site/index.css">'))
+        self.assertEqual(site.resolve("/site/blog/tom/")[0], 200)
+        self.assertEqual(site.resolve("/site/index.css")[0], 200)
+        self.assertEqual(site.resolve("/blog/tom/")[0], 404)
+
+    def test_variables_from_command_line(self):
+        args = parse_args(["--var", "Site=Shire"])
+        write_file(self.template, "{{ Title }} - {{ Site }}", 2)
+        site = PreviewSite(self.content, self.template, self.static,
+                           variables=parse_variables(args.var))
+        self.assertEqual(site.resolve("/")[1], b"Home - Shire")
+
+    def test_find_source(self):
+        expected = os.path.join(self.content, "blog", "tom", "index.md")
+        for parts in (["blog", "tom"], ["blog", "tom", "index.html"]):
+            self.assertEqual(find_source(self.content, parts), expected)
+        self.assertIsNone(find_source(self.content, ["missing"]))
+
+    def test_lru_cache_evicts_oldest(self):
+        cache = PageCache(max_entries=2)
+        cache.put("a", 1, "A")
+        cache.put("b", 1, "B")
+        cache.get("a", 1)
+        cache.put("c", 1, "C")
+        self.assertEqual(cache.get("a", 1), "A")
+        self.assertIsNone(cache.get("b", 1))
+        self.assertIsNone(cache.get("a", 2))
+
+    def test_page_cached_until_source_changes(self):
+        status, body, _, _ = self.site.resolve("/blog/tom")
+        self.assertEqual((status, body), (200, b'Tom|<link href="/index.css">'))
+        self.site.resolve("/blog/tom/")
+        self.assertEqual(self.site.cache.hits, 1)
+        write_file(os.path.join(self.content, "blog", "tom", "index.md"), "# Bombadil", 2)
+        _, body, _, _ = self.site.resolve("/blog/tom")
+        self.assertTrue(body.startswith(b"Bombadil|"))
+
+    def test_http_etag_and_not_modified(self):
+        server = make_server(self.site, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(f"{base}/index.css") as response:
+                etag = response.headers["ETag"]
+                self.assertEqual(response.read(), b"body {}")
+            request = urllib.request.Request(
+                f"{base}/index.css", headers={"If-None-Match": etag})
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(request)
+            self.assertEqual(context.exception.code, 304)
+            with self.assertRaises(urllib.error.HTTPError) as context:
+                urllib.request.urlopen(f"{base}/nope")
+            self.assertEqual(context.exception.code, 404)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
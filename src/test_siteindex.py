@@ -0,0 +1,88 @@
+import os
+import sqlite3
+import unittest
+
+from siteindex import SiteIndex, open_index, page_url
+from fixtures import SiteTestCase, write_file
+
+
+class TestSiteIndex(SiteTestCase):
+    PAGES = {"index.md": "# Home", "blog/tom/index.md": "# Tom",
+             "blog/elf/index.md": "# Elf & Co"}
+
+    def build(self, site_url="https://example.com", basepath="/"):
+        super().build(basepath, index_path=self.index_path, site_url=site_url)
+
+    def indexed(self):
+        connection = open_index(self.index_path)
+        try:
+            return {url: title for url, title, _ in SiteIndex(connection).pages()}
+        finally:
+            connection.close()
+
+    def test_page_url(self):
+        self.assertEqual(page_url(os.path.join("docs", "index.html"), "docs"), "")
+        self.assertEqual(page_url(os.path.join("docs", "blog", "tom", "index.html"),
+                                  "docs"), "blog/tom/")
+        self.assertEqual(page_url(os.path.join("docs", "about.html"), "docs"),
+                         "about.html")
+
+    def test_pages_indexed(self):
+        self.build()
+        self.assertEqual(self.indexed(), {
+            "": "Home", "blog/elf/": "Elf & Co", "blog/tom/": "Tom"})
+
+    def test_sitemap_and_feed(self):
+        self.build(basepath="/site/")
+        sitemap = self.read("sitemap.xml")
+        self.assertIn("<loc>https://example.com/site/blog/tom/</loc>", sitemap)
+        self.assertIn("<loc>https://example.com/site/</loc>", sitemap)
+        feed = self.read("blog", "feed.xml")
+        self.assertIn("<title>Elf &amp; Co</title>", feed)
+        self.assertNotIn("<title>Home</title><link>https://example.com/site/</link>",
+                         feed)
+
+    def test_no_site_url_no_sitemap(self):
+        self.build(site_url=None)
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "sitemap.xml")))
+        self.assertEqual(len(self.indexed()), 3)
+
+    def test_unchanged_build_leaves_sitemap(self):
+        self.build()
+        sitemap_path = os.path.join(self.docs, "sitemap.xml")
+        os.utime(sitemap_path, ns=(0, 0))
+        self.build()
+        self.assertEqual(os.stat(sitemap_path).st_mtime_ns, 0)
+
+    def test_changed_and_removed_pages_updated(self):
+        self.build()
+        write_file(os.path.join(self.content, "blog", "tom", "index.md"), "# Tom, again")
+        os.remove(os.path.join(self.content, "blog", "elf", "index.md"))
+        self.build()
+        self.assertEqual(self.indexed(), {"": "Home", "blog/tom/": "Tom, again"})
+        self.assertNotIn("blog/elf/", self.read("sitemap.xml"))
+
+    def test_lost_index_rebuilt_without_rendering(self):
+        self.build()
+        os.remove(self.index_path)
+        self.build()
+        self.assertEqual(len(self.indexed()), 3)
+
+    def test_version_change_drops_every_table(self):
+        self.build()
+        connection = sqlite3.connect(self.index_path)
+        with connection:
+            connection.execute("INSERT INTO links VALUES ('old.md', 1, 'link', '/x')")
+            connection.execute("UPDATE meta SET value = '0' WHERE key = 'version'")
+        connection.close()
+        connection = open_index(self.index_path)
+        try:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM links").fetchone(),
+                             (0,))
+            self.assertEqual(SiteIndex(connection).pages(), [])
+        finally:
+            connection.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from functions import markdown_to_blocks, block_to_block_type, markdown_to_html_node, BlockType
+from synthetic import generate_markdown
+
+
+class TestSynthetic(unittest.TestCase):
+    def test_deterministic(self):
+        self.assertEqual(generate_markdown(seed=3), generate_markdown(seed=3))
+        self.assertNotEqual(generate_markdown(seed=3), generate_markdown(seed=4))
+
+    def test_block_counts(self):
+        markdown = generate_markdown(sections=10, headings=2, paragraphs=3,
+                                     list_length=4)
+        types = [block_to_block_type(block)
+                 for block in markdown_to_blocks(markdown)]
+        self.assertEqual(types.count(BlockType.HEADING), 1 + 10 * 2)
+        self.assertEqual(types.count(BlockType.PARAGRAPH), 10 * 3)
+        self.assertEqual(types.count(BlockType.UNORDERED_LIST), 5)
+        self.assertEqual(types.count(BlockType.ORDERED_LIST), 5)
+
+    def test_link_density_zero_is_plain_text(self):
+        markdown = generate_markdown(link_density=0, sections=2)
+        self.assertNotIn("](", markdown)
+        self.assertTrue(markdown_to_html_node(markdown).to_html())
+
+
+if __name__ == "__main__":
+    unittest.main()
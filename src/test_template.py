@@ -0,0 +1,170 @@
+import io
+import os
+import tempfile
+import unittest
+
+from template import Template, load_template, select_template
+from functions import generate_pages_recursively
+from buildoptions import BuildOptions
+from manifest import load_manifest, dependent_pages
+from fixtures import write_file
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_title_and_content(self):
+        template = Template("<title>{{ Title }}</title><p>{{ Content }}</p>")
+        self.assertEqual(
+            template.render({"Title": "Hi", "Content": "<b>x</b>"}),
+            "<title>Hi</title><p><b>x</b></p>",
+        )
+
+    def test_arbitrary_placeholders(self):
+        template = Template("{{Author}} wrote {{ Title }}")
+        self.assertEqual(template.names, ["Author", "Title"])
+        self.assertEqual(
+            template.render({"Author": "Tolkien", "Title": "LOTR"}),
+            "Tolkien wrote LOTR",
+        )
+
+    def test_unknown_placeholder_left_alone(self):
+        template = Template("<p>{{ Missing }}</p>")
+        self.assertEqual(template.render({}), "<p>{{ Missing }}</p>")
+
+    def test_basepath_applied_to_template_and_values(self):
+        template = Template(
+            '<link href="/index.css" />{{ Content }}<a href="https://x">')
+        html = template.render(
+            {"Content": '<img src="/a.png"><a href="/blog">'}, "/site/")
+        self.assertEqual(
+            html,
+            '<link href="/site/index.css" /><img src="/site/a.png">'
+            '<a href="/site/blog"><a href="https://x">',
+        )
+
+    def test_rebased_literals_kept_for_last_map_only(self):
+        template = Template('<link href="/index.css">{{ Content }}')
+        first = template.rebased_literals("/", {"index.css": "index.1.css"})
+        for _ in range(3):
+            # an equal map unpickled per page still hits
+            self.assertIs(template.rebased_literals("/", {"index.css": "index.1.css"}),
+                          first)
+        self.assertEqual(template.rebased_literals("/site/", None)[0],
+                         '<link href="/site/index.css">')
+        self.assertIsNot(template.rebased_literals("/", {"index.css": "index.1.css"}),
+                         first)
+
+    def test_write_to_file(self):
+        template = Template("[{{ Content }}]")
+        output = io.StringIO()
+        template.write(output, {"Content": "body"})
+        self.assertEqual(output.getvalue(), "[body]")
+
+    def test_load_template_is_cached(self):
+        with tempfile.TemporaryDirectory() as root:
+            path = os.path.join(root, "template.html")
+            with open(path, "w") as file:
+                file.write("{{ Title }}")
+            self.assertIs(load_template(path), load_template(path))
+            with open(path, "w") as file:
+                file.write("{{ Title }}!")
+            os.utime(path, ns=(0, 0))
+            self.assertEqual(load_template(path).render({"Title": "a"}), "a!")
+
+
+class TestTemplateSelection(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = self.temp_dir.name
+        self.content = os.path.join(root, "content")
+        self.docs = os.path.join(root, "docs")
+        self.template = os.path.join(root, "template.html")
+        self.header = os.path.join(root, "partials", "header.html")
+        self.footer = os.path.join(root, "partials", "footer.html")
+        write_file(self.template, "{{> partials/header.html }}{{ Content }}", 1)
+        write_file(self.header, "<h>{{ Title }}</h>{{> footer.html }}", 1)
+        write_file(self.footer, "<f>", 1)
+        write_file(os.path.join(self.content, "index.md"), "# Home")
+        write_file(os.path.join(self.content, "blog", "template.html"),
+                   "blog:{{ Content }}", 1)
+        write_file(os.path.join(self.content, "blog", "post.md"), "# Post")
+        write_file(os.path.join(self.content, "blog", "deep", "post.md"), "# Deep")
+        write_file(os.path.join(self.content, "about.md"), "# About")
+        write_file(os.path.join(self.content, "about.template.html"),
+                   "about:{{> ../partials/footer.html }}{{ Content }}", 1)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def build(self):
+        return generate_pages_recursively(
+            self.content, self.template, self.docs, BuildOptions())
+
+    def read(self, *parts):
+        with open(os.path.join(self.docs, *parts)) as file:
+            return file.read()
+
+    def test_partials_expanded(self):
+        template = load_template(self.template)
+        self.assertEqual(template.render({"Title": "T", "Content": "c"}),
+                         "<h>T</h><f>c")
+        self.assertEqual(template.dependencies,
+                         [self.template, self.header, self.footer])
+
+    def test_include_cycle(self):
+        write_file(self.footer, "{{> header.html }}")
+        with self.assertRaises(ValueError):
+            load_template(self.template)
+
+    def test_partial_change_invalidates_cache(self):
+        load_template(self.template)
+        write_file(self.footer, "<footer>", 2)
+        self.assertEqual(load_template(self.template).render({"Title": "T"}),
+                         "<h>T</h><footer>{{ Content }}")
+
+    def test_select_template(self):
+        def select(*parts):
+            return select_template(os.path.join(self.content, *parts),
+                                   self.content, self.template)
+        blog_template = os.path.join(self.content, "blog", "template.html")
+        self.assertEqual(select("index.md"), self.template)
+        self.assertEqual(select("blog", "post.md"), blog_template)
+        self.assertEqual(select("blog", "deep", "post.md"), blog_template)
+        self.assertEqual(select("about.md"),
+                         os.path.join(self.content, "about.template.html"))
+
+    def test_pages_use_their_templates(self):
+        self.build()
+        self.assertEqual(self.read("index.html"), "<h>Home</h><f><div><h1>Home</h1></div>")
+        self.assertEqual(self.read("blog", "deep", "post.html"),
+                         "blog:<div><h1>Deep</h1></div>")
+        self.assertEqual(self.read("about.html"), "about:<f><div><h1>About</h1></div>")
+
+    def test_graph_recorded(self):
+        self.build()
+        manifest = load_manifest(self.docs)
+        self.assertEqual(sorted(dependent_pages(manifest, self.footer)), sorted([
+            os.path.join(self.content, "index.md"),
+            os.path.join(self.content, "about.md")]))
+        self.assertEqual(dependent_pages(manifest, self.header),
+                         [os.path.join(self.content, "index.md")])
+
+    def test_partial_change_rebuilds_only_dependents(self):
+        self.build()
+        write_file(self.header, "<header>{{ Title }}</header>", 2)
+        stats = self.build()
+        self.assertEqual(stats.written, 1)
+        self.assertEqual(self.read("index.html"),
+                         "<header>Home</header><div><h1>Home</h1></div>")
+
+    def test_new_directory_template_picked_up(self):
+        self.build()
+        write_file(os.path.join(self.content, "blog", "deep", "template.html"),
+                   "deep:{{ Content }}")
+        stats = self.build()
+        self.assertEqual(stats.written, 1)
+        self.assertEqual(self.read("blog", "deep", "post.html"),
+                         "deep:<div><h1>Deep</h1></div>")
+
+
+if __name__ == "__main__":
+    unittest.main()
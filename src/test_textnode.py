@@ -26,6 +26,13 @@ class TestTextNode(unittest.TestCase):
         with self.assertRaises(AttributeError):
             TextNode("this is bad", TextType.DOG)
 
+    def test_text_type_from_value(self):
+        node = TextNode("This is a text node", "bold")
+        self.assertEqual(node.text_type, TextType.BOLD)
+
+    def test_no_instance_dict(self):
+        self.assertFalse(hasattr(TextNode("text", TextType.TEXT), "__dict__"))
+
     def test_eq_functions_properly_on_text(self):
         node = TextNode("This is a text node", TextType.BOLD)
         node2 = TextNode("This is a different text node", TextType.BOLD)
@@ -0,0 +1,119 @@
+import io
+import gzip
+import os
+import unittest
+from contextlib import redirect_stdout
+
+from functions import generate_pages_recursively
+from filefunctions import sync_static_to_public
+from watcher import SiteWatcher, take_snapshot, diff_snapshots
+from buildoptions import BuildOptions
+from fixtures import SiteTestCase, write_file, png_bytes
+
+
+class TestWatcher(SiteTestCase):
+    PAGES = {"index.md": "# Home", "blog/post.md": "# Post"}
+    STATIC = {"index.css": "body {}"}
+    MTIME = 1
+
+    def setUp(self):
+        super().setUp()
+        sync_static_to_public(self.static, self.docs)
+        self.build()
+        self.watcher = SiteWatcher(self.content, self.template, self.docs,
+                                   BuildOptions(static_dir=self.static))
+
+    def test_diff_snapshots(self):
+        old = {"a": (1, 1), "b": (1, 1)}
+        new = {"a": (2, 1), "c": (1, 1)}
+        self.assertEqual(diff_snapshots(old, new), ({"a", "c"}, {"b"}))
+
+    def test_snapshot_covers_watched_paths(self):
+        snapshot = take_snapshot(self.watcher.watched_paths())
+        self.assertIn(self.template, snapshot)
+        self.assertIn(os.path.join(self.content, "blog", "post.md"), snapshot)
+
+    def test_no_changes(self):
+        self.assertEqual(self.watcher.poll(), [])
+
+    def test_markdown_edit_rebuilds_one_page(self):
+        post = os.path.join(self.content, "blog", "post.md")
+        write_file(post, "# Edited", 2)
+        self.assertEqual(self.watcher.poll(), [post])
+        self.assertEqual(self.read("blog", "post.html"),
+                         "Edited|<div><h1>Edited</h1></div>")
+
+    def test_template_edit_rebuilds_every_page(self):
+        write_file(self.template, "[{{ Title }}]", 2)
+        self.assertEqual(self.watcher.poll(), [self.template])
+        self.assertEqual(self.read("index.html"), "[Home]")
+        self.assertEqual(self.read("blog", "post.html"), "[Post]")
+
+    def test_partial_edit_rebuilds_pages_using_it(self):
+        partial = os.path.join(self.root, "partials", "nav.html")
+        write_file(partial, "<nav>", 1)
+        write_file(os.path.join(self.content, "blog", "template.html"),
+                   "{{> ../../partials/nav.html }}{{ Title }}", 1)
+        self.watcher.poll()
+        self.assertIn(partial, self.watcher.watched_paths())
+        write_file(partial, "<menu>", 2)
+        self.assertEqual(self.watcher.poll(), [partial])
+        self.assertEqual(self.read("blog", "post.html"), "<menu>Post")
+        self.assertEqual(self.read("index.html"), "Home|<div><h1>Home</h1></div>")
+
+    def test_resized_image_rebuilds_pages_showing_it(self):
+        image = os.path.join(self.static, "images", "a.png")
+        os.makedirs(os.path.dirname(image))
+        with open(image, "wb") as file:
+            file.write(png_bytes(4, 3))
+        post = os.path.join(self.content, "blog", "post.md")
+        write_file(post, "# Post\n\n![a](/images/a.png)", 2)
+        self.watcher.poll()
+        self.assertIn('width="4" height="3"', self.read("blog", "post.html"))
+        with open(image, "wb") as file:
+            file.write(png_bytes(8, 6) + b"\x00")
+        self.assertEqual(self.watcher.poll(), [post, image])
+        self.assertIn('width="8" height="6"', self.read("blog", "post.html"))
+
+    def test_deleted_markdown_removes_page(self):
+        os.remove(os.path.join(self.content, "blog", "post.md"))
+        self.watcher.poll()
+        self.assertFalse(os.path.exists(os.path.join(self.docs, "blog")))
+
+    def test_asset_edit_copies_one_file(self):
+        write_file(os.path.join(self.static, "index.css"), "p {}", 2)
+        write_file(os.path.join(self.static, "new.css"), "a {}", 2)
+        self.assertEqual(len(self.watcher.poll()), 2)
+        self.assertEqual(self.read("index.css"), "p {}")
+        self.assertEqual(self.read("new.css"), "a {}")
+
+
+class TestWatcherStages(SiteTestCase):
+    PAGES = {"index.md": "# Home\n\n" + "Hobbits like food. " * 100}
+    MTIME = 1
+
+    def watcher(self, **options):
+        options = BuildOptions(static_dir=self.static, index_path=self.index_path,
+                               **options)
+        generate_pages_recursively(self.content, self.template, self.docs, options)
+        return SiteWatcher(self.content, self.template, self.docs, options)
+
+    def test_compressed_siblings_follow_rebuilds(self):
+        watcher = self.watcher(compress=True, compress_min_size=0)
+        watcher.finish_changes()
+        write_file(os.path.join(self.content, "index.md"), "# Second\n\n" + "Elves. " * 100, 2)
+        watcher.poll()
+        with gzip.open(os.path.join(self.docs, "index.html.gz"), "rt") as file:
+            self.assertEqual(file.read(), self.read("index.html"))
+
+    def test_links_checked_after_rebuilds(self):
+        watcher = self.watcher(check_links=True)
+        write_file(os.path.join(self.content, "index.md"), "# Home\n\n[gone](/gone)", 2)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            watcher.poll()
+        self.assertIn("broken link '/gone'", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import stat
+import tempfile
+import unittest
+
+from writer import write_if_changed, WriteStats
+
+
+class TestWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "out", "index.html")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def read(self):
+        with open(self.path) as file:
+            return file.read()
+
+    def test_writes_new_file(self):
+        self.assertTrue(write_if_changed(self.path, ["<p>", "hi", "</p>"]))
+        self.assertEqual(self.read(), "<p>hi</p>")
+        mode = stat.S_IMODE(os.stat(self.path).st_mode)
+        self.assertEqual(mode & 0o044, 0o044)
+
+    def test_identical_content_skipped(self):
+        write_if_changed(self.path, ["same"])
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(write_if_changed(self.path, ["sa", "me"]))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, 0)
+
+    def test_same_size_different_content_written(self):
+        write_if_changed(self.path, ["aaaa"])
+        self.assertTrue(write_if_changed(self.path, ["bbbb"]))
+        self.assertEqual(self.read(), "bbbb")
+
+    def test_no_temp_files_left(self):
+        write_if_changed(self.path, ["x"])
+        write_if_changed(self.path, ["x"])
+
+        def failing_chunks():
+            yield "partial"
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            write_if_changed(self.path, failing_chunks())
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["index.html"])
+        self.assertEqual(self.read(), "x")
+
+    def test_write_stats(self):
+        stats = WriteStats()
+        for written in (True, False, True):
+            stats.add(written)
+        self.assertEqual(repr(stats), "2 written, 1 unchanged")
+
+
+if __name__ == "__main__":
+    unittest.main()
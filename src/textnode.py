@@ -11,9 +11,14 @@ class TextType(Enum):
 
 
 class TextNode:
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, text, text_type, url=None):
         self.text = text
-        self.text_type = TextType(text_type)
+        # the parser always passes members, only convert raw values
+        if text_type.__class__ is not TextType:
+            text_type = TextType(text_type)
+        self.text_type = text_type
         self.url = url
 
     def __eq__(self, other):
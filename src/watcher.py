@@ -0,0 +1,224 @@
+import os
+import time
+
+from functions import (generate_page, generate_pages_recursively, page_destination,
+                       extract_title_from_file, page_search_terms, page_references)
+from filefunctions import copy_static_file, remove_static_file, save_static_manifest
+from assets import fingerprint_static
+from compress import compress_output
+from siteindex import open_index, update_site_index
+from search import update_search_index
+from linkindex import update_link_index
+from linkcheck import check_links
+from template import load_template, select_template
+from manifest import (hash_file, load_manifest, save_manifest, remove_empty_dirs,
+                      record_template, dependent_pages)
+
+
+def scan_tree(root, snapshot):
+    try:
+        entries = list(os.scandir(root))
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            scan_tree(entry.path, snapshot)
+        elif entry.is_file():
+            stat = entry.stat()
+            snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+
+
+def take_snapshot(paths):
+    snapshot = {}
+    for path in paths:
+        if os.path.isdir(path):
+            scan_tree(path, snapshot)
+        elif os.path.isfile(path):
+            stat = os.stat(path)
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+    return snapshot
+
+
+def diff_snapshots(old, new):
+    changed = {path for path, key in new.items() if old.get(path) != key}
+    removed = set(old) - set(new)
+    return changed, removed
+
+
+class SiteWatcher:
+    def __init__(self, content_dir, template_path, dest_dir, options):
+        # options.static_dir is both the watched asset tree and where pages
+        # look up their images
+        self.content_dir = content_dir
+        self.template_path = template_path
+        self.static_dir = options.static_dir
+        self.dest_dir = dest_dir
+        if options.index_path is None:
+            options = options.replace(search=False, check_links=False)
+        if options.fingerprint:
+            options = options.replace(asset_map=fingerprint_static(
+                self.static_dir, dest_dir, options.jobs))
+        self.options = options
+        self.manifest = load_manifest(dest_dir)
+        self.snapshot = take_snapshot(self.watched_paths())
+
+    def watched_paths(self):
+        # partials can live outside content/, the manifest knows them all
+        paths = [self.content_dir, self.static_dir, self.template_path]
+        if self.manifest is not None:
+            paths.extend(path for path in self.manifest["graph"]
+                         if not self.is_under(path, self.content_dir))
+        return paths
+
+    def is_template(self, path):
+        return (path == self.template_path or path in self.manifest["graph"] or
+                (self.is_under(path, self.content_dir) and path.endswith(".html")))
+
+    def is_under(self, path, directory):
+        return path.startswith(os.path.join(directory, ""))
+
+    def rebuild_all(self):
+        generate_pages_recursively(
+            self.content_dir, self.template_path, self.dest_dir, self.options)
+        self.manifest = load_manifest(self.dest_dir)
+
+    def rebuild_page(self, from_path):
+        destination_path = page_destination(
+            from_path, self.content_dir, self.dest_dir)
+        template_path = select_template(
+            from_path, self.content_dir, self.template_path)
+        record = generate_page(from_path, template_path, destination_path, self.options)
+        self.manifest["pages"][from_path] = {
+            "hash": hash_file(from_path), "output": destination_path,
+            "template": template_path, "images": record["images"],
+            "cache_key": record.get("cache_key")}
+        record_template(self.manifest, from_path, {
+            path: hash_file(path)
+            for path in load_template(template_path).dependencies})
+        return record
+
+    def remove_page(self, from_path):
+        entry = self.manifest["pages"].pop(from_path, None)
+        if entry is not None and os.path.exists(entry["output"]):
+            print(f"Removing '{entry['output']}', its source '{from_path}' is gone.")
+            os.remove(entry["output"])
+            remove_empty_dirs(os.path.dirname(entry["output"]), self.dest_dir)
+
+    def image_pages(self, paths):
+        # pages showing one of these images carry its width and height
+        return {from_path for from_path, entry in self.manifest["pages"].items()
+                if any(path in paths for path in entry.get("images", {}))}
+
+    def update_indexes(self, titles, terms, references):
+        options = self.options
+        connection = open_index(options.index_path)
+        try:
+            update_site_index(
+                connection, self.manifest["pages"], titles, self.dest_dir,
+                options.basepath, options.site_url, extract_title_from_file)
+            if options.search:
+                update_search_index(
+                    connection, self.manifest["pages"], terms, self.dest_dir,
+                    options.basepath, page_search_terms)
+            if options.check_links:
+                update_link_index(
+                    connection, self.manifest["pages"], references, self.dest_dir,
+                    page_references)
+        finally:
+            connection.close()
+
+    def apply_changes(self, changed, removed):
+        rebuilt = []
+        templates = sorted(path for path in changed | removed
+                           if self.manifest is not None and self.is_template(path))
+        if templates or self.manifest is None:
+            # the manifest's template graph narrows this down to the pages
+            # that actually use the changed template or partial
+            for path in templates:
+                print(f"'{path}' changed, {len(dependent_pages(self.manifest, path))} "
+                      f"pages use it.")
+            self.rebuild_all()
+            rebuilt.extend(templates or [self.template_path])
+        else:
+            titles = {}
+            terms = {}
+            references = {}
+            pages = {path for path in changed | removed
+                     if self.is_under(path, self.content_dir) and path.endswith(".md")}
+            pages |= self.image_pages(changed | removed)
+            for path in sorted(pages):
+                if path in removed:
+                    self.remove_page(path)
+                else:
+                    record = self.rebuild_page(path)
+                    titles[path] = record["title"]
+                    if "search" in record:
+                        terms[path] = record["search"]
+                    if "references" in record:
+                        references[path] = record["references"]
+                rebuilt.append(path)
+            if rebuilt:
+                save_manifest(self.dest_dir, self.manifest)
+                if self.options.index_path is not None:
+                    self.update_indexes(titles, terms, references)
+
+        static_changes = False
+        for path in sorted(changed | removed):
+            if not self.is_under(path, self.static_dir):
+                continue
+            item = os.path.relpath(path, self.static_dir)
+            if path in removed:
+                remove_static_file(self.dest_dir, item)
+            else:
+                copy_static_file(self.static_dir, self.dest_dir, item, self.options.minify)
+            static_changes = True
+            rebuilt.append(path)
+        if static_changes:
+            save_static_manifest(self.dest_dir, [
+                os.path.relpath(path, self.static_dir) for path in self.snapshot
+                if self.is_under(path, self.static_dir)])
+            if self.options.fingerprint:
+                asset_map = fingerprint_static(
+                    self.static_dir, self.dest_dir, self.options.jobs)
+                if asset_map != self.options.asset_map:
+                    # pages link to the old names until they are rendered again
+                    self.options = self.options.replace(asset_map=asset_map)
+                    self.rebuild_all()
+        return rebuilt
+
+    def finish_changes(self):
+        # what build() does after rendering, so a rebuilt page is never
+        # served from a stale .gz or left with its links unchecked
+        options = self.options
+        if options.compress:
+            compress_output(self.dest_dir, options.jobs, options.compress_min_size)
+        if options.check_links:
+            check_links(self.dest_dir, options.basepath, options.index_path)
+
+    def poll(self):
+        snapshot = take_snapshot(self.watched_paths())
+        changed, removed = diff_snapshots(self.snapshot, snapshot)
+        self.snapshot = snapshot
+        if not changed and not removed:
+            return []
+        start = time.perf_counter()
+        rebuilt = self.apply_changes(changed, removed)
+        if rebuilt:
+            self.finish_changes()
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"Rebuilt {len(rebuilt)} changed file(s) in {elapsed:.1f} ms.")
+        return rebuilt
+
+    def run(self, interval=0.25):
+        print(f"Watching '{self.content_dir}', '{self.static_dir}' and "
+              f"'{self.template_path}' for changes (Ctrl+C to stop).")
+        try:
+            while True:
+                time.sleep(interval)
+                try:
+                    self.poll()
+                except Exception as error:
+                    # keep watching, the next save usually fixes a bad edit
+                    print(f"Rebuild failed: {error}")
+        except KeyboardInterrupt:
+            print("Stopped watching.")
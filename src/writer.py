@@ -0,0 +1,64 @@
+import os
+import hashlib
+import tempfile
+
+from manifest import hash_file
+
+# mkstemp creates files as 0600, so finished outputs get the permissions a
+# plain open() would have given them
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def output_unchanged(destination_path, size, digest):
+    try:
+        if os.stat(destination_path).st_size != size:
+            return False
+    except FileNotFoundError:
+        return False
+    return hash_file(destination_path) == digest
+
+
+def write_if_changed(destination_path, chunks):
+    # Streams the chunks to a temp file next to the destination while
+    # hashing them. If the file on disk already has the same size and hash
+    # the temp file is dropped and the old file (and its mtime) is kept,
+    # otherwise the temp file is renamed over it in one step.
+    directory = os.path.dirname(destination_path) or "."
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+    size = 0
+    descriptor, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            for chunk in chunks:
+                data = chunk.encode()
+                digest.update(data)
+                size += len(data)
+                file.write(data)
+        if output_unchanged(destination_path, size, digest.hexdigest()):
+            os.remove(temp_path)
+            return False
+        os.chmod(temp_path, 0o666 & ~_UMASK)
+        os.replace(temp_path, destination_path)
+        return True
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class WriteStats:
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+
+    def add(self, written):
+        if written:
+            self.written += 1
+        else:
+            self.skipped += 1
+
+    def __repr__(self):
+        return f"{self.written} written, {self.skipped} unchanged"